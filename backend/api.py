@@ -1,10 +1,13 @@
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import gzip
+import hashlib
 import json
 import os
 import sys
-import time
+import threading
+from datetime import datetime, timedelta, timezone
 from push import send_push_notification
 
 # Setup logging
@@ -18,14 +21,147 @@ try:
 except ImportError:
     from backend.feeds import RSS_FEEDS
 
+# B3 ticker database, regenerated by update_tickers.py (the API is restarted afterwards)
+try:
+    from b3_tickers import B3_TICKERS
+except ImportError:
+    try:
+        from backend.b3_tickers import B3_TICKERS
+    except ImportError:
+        B3_TICKERS = {}
+
+# Signals and tokens live in the SQLite store shared with monitor.py
+try:
+    import db
+except ImportError:
+    from backend import db
+
+try:
+    from signal_cache import SignalCache
+except ImportError:
+    from backend.signal_cache import SignalCache
+
+try:
+    from signal_hub import SignalHub
+except ImportError:
+    from backend.signal_hub import SignalHub
+
+try:
+    from ticker_catalog import TickerCatalog, SEARCH_LIMIT
+except ImportError:
+    from backend.ticker_catalog import TickerCatalog, SEARCH_LIMIT
+
+try:
+    from dashboard import DashboardSnapshot
+except ImportError:
+    from backend.dashboard import DashboardSnapshot
+
 app = Flask(__name__)
 CORS(app) # Allow cross-origin requests from mobile
 
-TOKENS_FILE = os.path.join(os.path.dirname(__file__), 'tokens.json')
-TOKENS_FILE = os.path.join(os.path.dirname(__file__), 'tokens.json')
-SIGNALS_FILE = os.path.join(os.path.dirname(__file__), "signals.json")
+# Response compression / validation (see finish_response)
+GZIP_MIN_SIZE = 500 # bytes; smaller bodies are not worth compressing
+GZIP_LEVEL = 6
+COMPRESSIBLE_TYPES = ('application/json', 'text/html')
+
 STATUS_FILE = os.path.join(os.path.dirname(__file__), "status.json")
 
+# What the dashboard's /api/data serves, updated only where something changed
+dashboard_snapshot = DashboardSnapshot(STATUS_FILE)
+
+# Newest signals kept in memory, reloaded only when monitor.py records a change
+signal_cache = SignalCache()
+
+# Wakes /stream clients and long-polls as soon as monitor.py records a signal
+signal_hub = SignalHub()
+STREAM_HEARTBEAT = 15 # seconds between keep-alive comments on idle streams
+MAX_WAIT = 30 # longest long-poll (/signals?since=...&wait=N)
+# Open streams and long-polls each hold a worker thread for their whole duration.
+# They are capped per worker process (default: half of its threads, see gunicorn.conf.py)
+# so /signals, /register and the rest always find a free thread. Over the cap, /stream
+# answers 503 with a retry hint and long-polls answer right away: clients fall back to polling.
+MAX_STREAMS = int(os.environ.get("NOTIFYINVEST_MAX_STREAMS", int(os.environ.get("NOTIFYINVEST_THREADS", 32)) // 2))
+STREAM_RETRY = 30 # seconds a client turned away should wait before reconnecting
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS) if MAX_STREAMS > 0 else None # 0 turns streaming off
+
+def content_version(data):
+    """Short digest of static data, identical in every worker process."""
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+# Versions of data that only change with a restart
+SOURCES = sorted(set(f.get('name', 'Unknown') for f in RSS_FEEDS))
+SOURCES_VERSION = content_version(SOURCES)
+
+TICKERS_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>NotifyInvest - B3 Tickers</title>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #f0f2f5; margin: 0; padding: 20px; color: #333; }
+        .container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.05); }
+        h1 { margin-bottom: 20px; text-align: center; color: #1a1a1a; }
+        .search-box { width: 100%%; padding: 12px; border: 1px solid #ddd; border-radius: 8px; margin-bottom: 20px; font-size: 1rem; box-sizing: border-box; }
+        table { width: 100%%; border-collapse: collapse; }
+        th, td { text-align: left; padding: 12px; border-bottom: 1px solid #eee; }
+        th { background: #f8f9fa; position: sticky; top: 0; }
+        tr:hover { background: #f5f5f5; }
+        .count { text-align: center; color: #666; margin-bottom: 20px; }
+        .back-btn { display: inline-block; margin-bottom: 20px; color: #2196F3; text-decoration: none; font-weight: 500; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <a href="/dashboard" class="back-btn">← Back to Dashboard</a>
+        <h1>B3 Ticker Database</h1>
+        <div class="count">Tracking <strong>%d</strong> companies</div>
+        
+        <input type="text" id="search" class="search-box" placeholder="Search ticker or name..." onkeyup="filterTable()">
+        
+        <table id="tickerTable">
+            <thead>
+                <tr>
+                    <th>Company / Key</th>
+                    <th>Ticker</th>
+                </tr>
+            </thead>
+            <tbody>
+                %s
+            </tbody>
+        </table>
+    </div>
+
+    <script>
+        function filterTable() {
+            const input = document.getElementById('search');
+            const filter = input.value.toUpperCase();
+            const table = document.getElementById('tickerTable');
+            const tr = table.getElementsByTagName('tr');
+
+            for (let i = 1; i < tr.length; i++) {
+                const tds = tr[i].getElementsByTagName('td');
+                let show = false;
+                for (let j = 0; j < tds.length; j++) {
+                    if (tds[j].textContent.toUpperCase().indexOf(filter) > -1) {
+                        show = true;
+                        break;
+                    }
+                }
+                tr[i].style.display = show ? '' : 'none';
+            }
+        }
+    </script>
+</body>
+</html>
+"""
+
+# Ticker views (page, JSON, search index), built once for this ticker-DB version
+ticker_catalog = TickerCatalog(B3_TICKERS)
+TICKERS_PAGE = (TICKERS_HTML % (len(ticker_catalog), ticker_catalog.rows_html)).encode('utf-8')
+TICKERS_PAGE_GZIP = gzip.compress(TICKERS_PAGE, 9)
+
 DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html lang="en">
@@ -97,6 +233,18 @@ DASHBOARD_HTML = """
 
 
             
+            <!-- Signal Stats -->
+            <div class="card">
+                <h2>📊 Signal Stats</h2>
+                <div class="stat" id="signal-count">0</div>
+                <div id="signal-breakdown" style="margin-top: 5px; color: #666; font-size: 0.9rem;">-</div>
+                <div style="margin-top: 10px; max-height: 150px; overflow-y: auto;">
+                    <table id="stats-table">
+                        <!-- Top tickers / sources here -->
+                    </table>
+                </div>
+            </div>
+
             <!-- RSS Feeds -->
             <div class="card">
                 <h2>📡 Active Feeds</h2>
@@ -157,14 +305,14 @@ DASHBOARD_HTML = """
                 document.getElementById('last-update').textContent = status.last_update ? new Date(status.last_update * 1000).toLocaleString() : 'Never';
                 document.getElementById('current-message').textContent = status.message || 'No status message';
 
-                // Update Tokens
-                const tokenKeys = Object.keys(data.tokens || {});
-                document.getElementById('token-count').textContent = tokenKeys.length;
+                // Update Tokens (count + most recent registrations)
+                const tokens = data.tokens || {};
+                document.getElementById('token-count').textContent = tokens.count || 0;
                 const tokenTable = document.getElementById('token-table');
-                tokenTable.innerHTML = tokenKeys.map(t => `
+                tokenTable.innerHTML = (tokens.recent || []).map(t => `
                     <tr>
                         <td style="font-family: monospace; font-size: 0.8rem;">
-                            ${t.substring(0, 20)}...
+                            ${t}...
                         </td>
                     </tr>
                 `).join('');
@@ -188,6 +336,21 @@ DASHBOARD_HTML = """
                     `;
                 }).join('');
 
+                // Update Signal Stats
+                const stats = data.stats || {};
+                const bySignal = stats.by_signal || {};
+                document.getElementById('signal-count').textContent = stats.signals || 0;
+                document.getElementById('signal-breakdown').textContent = Object.entries(bySignal)
+                    .map(([k, v]) => `${k}: ${v}`).join(' · ') || '-';
+                const top = (counts, n) => Object.entries(counts || {}).sort((a, b) => b[1] - a[1]).slice(0, n);
+                const tickerTotals = {};
+                Object.entries(stats.by_ticker || {}).forEach(([t, c]) => {
+                    tickerTotals[t] = Object.values(c).reduce((a, b) => a + b, 0);
+                });
+                document.getElementById('stats-table').innerHTML =
+                    top(tickerTotals, 5).map(([t, n]) => `<tr><td><strong>${t}</strong></td><td>${n}</td></tr>`).join('') +
+                    top(stats.by_source, 5).map(([s, n]) => `<tr><td style="color: #555;">${s}</td><td>${n}</td></tr>`).join('');
+
                 // Update RSS Sources
                 const rssFeeds = status.rss_feeds || [];
                 document.getElementById('rss-count').textContent = status.rss_source_count || 0;
@@ -219,47 +382,124 @@ DASHBOARD_HTML = """
 
         // Initial load
         fetchData();
-        // Poll every 5 seconds
-        setInterval(fetchData, 5000);
+        // New signals arrive over the stream; the slow poll keeps the monitor status fresh
+        let poll = setInterval(fetchData, 30000);
+        if (window.EventSource) {
+            const stream = new EventSource('/stream');
+            stream.addEventListener('signal', fetchData);
+            stream.onerror = () => {
+                // Turned away (503) or gone for good: fall back to polling
+                if (stream.readyState === EventSource.CLOSED) {
+                    clearInterval(poll);
+                    poll = setInterval(fetchData, 5000);
+                }
+            };
+        } else {
+            clearInterval(poll);
+            poll = setInterval(fetchData, 5000);
+        }
     </script>
 </body>
 </html>
 """
 
-def load_signals():
-    if os.path.exists(SIGNALS_FILE):
-        try:
-            with open(SIGNALS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+def load_signals(limit=1000, search=None, **filters):
+    """
+    Newest signals (oldest first). Unfiltered requests are served from signal_cache,
+    unless they ask for more than it holds (e.g. the maximum page plus the has-more probe).
+    """
+    try:
+        if search or any(v is not None for v in filters.values()) or limit > signal_cache.size:
+            return db.get_signals(limit, search, **filters)
+        return signal_cache.latest(limit)
+    except Exception as e:
+        logger.error(f"Failed to load signals: {e}")
+        return []
 
 def load_tokens():
-    if not os.path.exists(TOKENS_FILE):
-        return {}
     try:
-        with open(TOKENS_FILE, 'r') as f:
-            data = json.load(f)
-                # Migration: if list, convert to dict
-            if isinstance(data, list):
-                new_data = {}
-                for t in data:
-                    new_data[t] = {"min_buy": 0, "min_sell": 0, "whitelist": [], "blacklist": []}
-                return new_data
-            
-            # Ensure new fields exist for existing dict entries
-            for t, prefs in data.items():
-                if "whitelist" not in prefs: prefs["whitelist"] = []
-                if "blacklist" not in prefs: prefs["blacklist"] = []
-                if "source_whitelist" not in prefs: prefs["source_whitelist"] = []
-            return data
-    except:
+        return db.load_tokens()
+    except Exception as e:
+        logger.error(f"Failed to load tokens: {e}")
         return {}
 
-def save_tokens(tokens):
-    with open(TOKENS_FILE, 'w') as f:
-        json.dump(tokens, f, indent=2)
+def parse_time(value, end_of_day=False):
+    """
+    Query-string time: unix timestamp or YYYY-MM-DD (UTC). None if missing or invalid.
+    With end_of_day, a date means the last moment of that day (for inclusive ranges).
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    if end_of_day:
+        day += timedelta(days=1, microseconds=-1)
+    return day.timestamp()
+
+def resolve_cursor(value, newer=False):
+    """
+    Pagination cursor (signal id or unix timestamp) -> position in the signal log.
+    For timestamps, newer=True picks the first signal at or after it. Raises KeyError for an unknown id.
+    """
+    try:
+        timestamp = float(value)
+    except ValueError:
+        seq = db.get_signal_seq(value)
+        if seq is None:
+            raise KeyError(value)
+        return seq
+    return db.get_seq_at(timestamp, newer=newer)
+
+def not_modified(etag):
+    """
+    Version-based validation, checked before any payload is built: returns a 304 response
+    when the client's If-None-Match already names this version, else None.
+    Callers must read the version before the data, so a tag never claims newer data than it covers.
+    """
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        return tagged(response, etag)
+    return None
+
+def tagged(response, etag):
+    """Attaches a version ETag (if known); clients may keep the body but must revalidate it."""
+    if not etag:
+        return response
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def acquire_stream_slot():
+    """Takes one of this worker's MAX_STREAMS slots without waiting. False when all are in use."""
+    return stream_slots is not None and stream_slots.acquire(blocking=False)
+
+def signals_etag(fresh=False):
+    """
+    Version tag of the signal store, or None if it cannot be read.
+    By default it comes from signal_cache (may lag by up to a second); fresh reads the store itself.
+    """
+    try:
+        revision = db.get_revision('signals') if fresh else signal_cache.snapshot()[0]
+        return f"signals-{revision}"
+    except Exception as e:
+        logger.error(f"Failed to read signals revision: {e}")
+        return None
+
+def precompressed(body, body_gzip, mimetype):
+    """Response from bytes prepared at startup, gzipped ahead of time if the client accepts it."""
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(body_gzip, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/status', methods=['GET'])
 def status():
@@ -273,24 +513,18 @@ def register():
     if not token or not token.startswith('ExponentPushToken'):
         return jsonify({"error": "Invalid token"}), 400
         
-    tokens = load_tokens()
-    
-    if token not in tokens:
-        tokens[token] = {"min_buy": 0, "min_sell": 0, "whitelist": [], "blacklist": [], "source_whitelist": []}
-        save_tokens(tokens)
+    if db.register_token(token):
         logger.info(f"New token registered: {token}")
-        return jsonify({"message": "Token registered successfully", "total_tokens": len(tokens)}), 201
+        return jsonify({"message": "Token registered successfully", "total_tokens": db.count_tokens()}), 201
     else:
         logger.info(f"Token already exists: {token}")
-        return jsonify({"message": "Token already registered", "total_tokens": len(tokens)}), 200
+        return jsonify({"message": "Token already registered", "total_tokens": db.count_tokens()}), 200
 
 @app.route('/debug/test', methods=['POST'])
 def debug_test():
     """Manual trigger for testing notification delivery and DB storage."""
     try:
         from push import send_push_notification
-        import uuid
-        import time
         
         # 1. Load Tokens
         tokens = load_tokens()
@@ -302,23 +536,7 @@ def debug_test():
         data = {"url": "https://google.com", "source_name": "Debug System"}
         
         # 3. Save to DB (Status/Signals)
-        if os.path.exists(SIGNALS_FILE):
-            with open(SIGNALS_FILE, 'r') as f:
-                signals = json.load(f)
-        else:
-            signals = []
-            
-        new_signal = {
-            "id": str(uuid.uuid4()),
-            "title": title,
-            "body": body,
-            "data": data,
-            "timestamp": time.time()
-        }
-        signals.append(new_signal)
-        # Keep last 1000
-        with open(SIGNALS_FILE, 'w') as f:
-            json.dump(signals[-1000:], f)
+        signal_id = db.insert_signal(title, body, data)
             
         # 4. Broadcast
         for token in tokens.keys():
@@ -331,7 +549,7 @@ def debug_test():
         return jsonify({
             "status": "completed",
             "db_updated": True,
-            "signal_id": new_signal['id'],
+            "signal_id": signal_id,
             "delivery_results": results
         }), 200
     except Exception as e:
@@ -340,63 +558,178 @@ def debug_test():
 
 @app.route('/preferences', methods=['GET', 'POST'])
 def preferences():
-    tokens = load_tokens()
-    
     if request.method == 'GET':
         token = request.args.get('token')
-        if not token or token not in tokens:
+        settings = db.get_prefs(token) if token else None
+        if settings is None:
             return jsonify({"error": "Token not found"}), 404
-        return jsonify(tokens[token]), 200
+        return jsonify(settings), 200
     
     if request.method == 'POST':
         data = request.json
         token = data.get('token')
-        if not token or token not in tokens:
+        if not token:
             return jsonify({"error": "Token not found"}), 404
             
-        settings = tokens[token]
+        changes = {}
         # Update fields if provided
-        if 'min_buy' in data: settings['min_buy'] = int(data['min_buy'])
-        if 'min_sell' in data: settings['min_sell'] = int(data['min_sell'])
-        if 'whitelist' in data: settings['whitelist'] = data['whitelist'] # Expecting list of strings
-        if 'blacklist' in data: settings['blacklist'] = data['blacklist'] # Expecting list of strings
-        if 'source_whitelist' in data: settings['source_whitelist'] = data['source_whitelist'] # Expecting list of strings
+        if 'min_buy' in data: changes['min_buy'] = int(data['min_buy'])
+        if 'min_sell' in data: changes['min_sell'] = int(data['min_sell'])
+        if 'whitelist' in data: changes['whitelist'] = data['whitelist'] # Expecting list of strings
+        if 'blacklist' in data: changes['blacklist'] = data['blacklist'] # Expecting list of strings
+        if 'source_whitelist' in data: changes['source_whitelist'] = data['source_whitelist'] # Expecting list of strings
         
-        tokens[token] = settings
-        save_tokens(tokens)
+        # Single-row update: cannot clobber a concurrent registration or another user's save
+        settings = db.update_prefs(token, changes)
+        if settings is None:
+            return jsonify({"error": "Token not found"}), 404
         return jsonify({"message": "Preferences saved", "settings": settings}), 200
 
 @app.route('/sources', methods=['GET'])
 def get_sources():
-    # Return unique source names
-    sources = list(set([f.get('name', 'Unknown') for f in RSS_FEEDS]))
-    sources.sort()
-    return jsonify(sources), 200
+    # Unique source names, sorted once at startup
+    etag = f"sources-{SOURCES_VERSION}"
+    return not_modified(etag) or tagged(jsonify(SOURCES), etag)
 
 @app.route('/signals', methods=['GET'])
 def get_signals():
-    signals = load_signals()
-    
-    # 1. Search Filter
-    query = request.args.get('search', '').lower()
-    if query:
-        signals = [s for s in signals if query in s['title'].lower() or query in s['body'].lower()]
+    # 1. Search Filter (full-text, accent insensitive) and exact filters
+    query = request.args.get('search', '').strip()
+    ticker = request.args.get('ticker') or None
+    source = request.args.get('source') or None
+    start = parse_time(request.args.get('from'))
+    end = parse_time(request.args.get('to'), end_of_day=True)
         
     # 2. Limit (Default 50, Max 1000)
     try:
         limit = int(request.args.get('limit', 50))
     except:
         limit = 50
-        
-    # Python slices are robust, even if list is smaller than limit
-    # Signals are appended (oldest first), we usually want newest first for API?
-    # Sort Newest First to apply limit to recent items
-    reversed_signals = list(reversed(signals))
-    limited_signals = reversed_signals[:limit]
-    
-    # Restore chronological order (Oldest First) for the App
-    final_signals = list(reversed(limited_signals))
-    return jsonify(final_signals), 200
+    limit = max(0, min(limit, 1000))
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_WAIT)
+
+    # Unchanged store -> 304 before anything is queried or serialized
+    # (not for long-polls, which must wait instead of answering right away)
+    etag = signals_etag()
+    if not wait:
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
+
+    # 3. Cursors (signal id or unix timestamp):
+    #    since  -> delta sync, only signals newer than what the app already has (oldest first,
+    #              continue with the last id while X-Has-More is true)
+    #    before -> page back through history
+    since = request.args.get('since')
+    before = request.args.get('before')
+    filters = {"ticker": ticker, "source": source, "start": start, "end": end}
+
+    # Polling with the newest id the app has is answered from memory
+    if since and not before and not query and not any(filters.values()):
+        try:
+            cached = signal_cache.after(since, limit)
+        except Exception as e:
+            logger.error(f"Failed to load signals: {e}")
+            cached = None
+        if cached is not None:
+            final_signals, has_more = cached
+            # Long-poll: with nothing new yet, hold the request until the hub sees a signal
+            if not final_signals and wait:
+                signal_hub.start()
+                position = signal_hub.current()
+                try:
+                    after = resolve_cursor(since)
+                except KeyError:
+                    return jsonify({"error": "Signal not found"}), 404
+                # This reads the store, which can be ahead of the cache the tag came from
+                etag = signals_etag(fresh=True)
+                final_signals = load_signals(limit + 1, after=after)
+                # No free stream slot: answer now, the client simply polls again
+                if not final_signals and acquire_stream_slot():
+                    try:
+                        signal_hub.wait(position, wait)
+                    finally:
+                        stream_slots.release()
+                    # The version read before the wait may be older than what arrived meanwhile;
+                    # tag with the store's own revision, read before the data, or the response
+                    # could be turned into a 304 for a client that still has the empty answer
+                    etag = signals_etag(fresh=True)
+                    # Re-read from the store so nothing between the cache and the hub is skipped
+                    final_signals = load_signals(limit + 1, after=after)
+                has_more = len(final_signals) > limit
+                final_signals = final_signals[:limit]
+            response = jsonify(final_signals)
+            response.headers['X-Has-More'] = 'true' if has_more else 'false'
+            return tagged(response, etag), 200
+
+    try:
+        if since:
+            filters["after"] = resolve_cursor(since)
+        if before:
+            filters["before"] = resolve_cursor(before, newer=True)
+    except KeyError:
+        return jsonify({"error": "Signal not found"}), 404
+
+    # The store applies filter and limit (one extra, to tell if there is more)
+    # and returns them in chronological order (Oldest First) for the App
+    final_signals = load_signals(limit + 1, query, **filters)
+    has_more = len(final_signals) > limit
+    if has_more:
+        # Drop the extra item on the far side from the cursor
+        final_signals = final_signals[:limit] if since else final_signals[1:]
+    response = jsonify(final_signals)
+    response.headers['X-Has-More'] = 'true' if has_more else 'false'
+    return tagged(response, etag), 200
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    """
+    Server-Sent Events: one 'signal' event per new signal (id = signal id, data = signal JSON).
+    A reconnecting client sends Last-Event-ID (or ?since=<id>) and first receives what it missed.
+    """
+    if not acquire_stream_slot():
+        # Too many open streams in this worker: keep threads free for ordinary requests
+        response = Response(f"retry: {STREAM_RETRY * 1000}\n\n", status=503, mimetype='text/event-stream')
+        response.headers['Retry-After'] = str(STREAM_RETRY)
+        return response
+    try:
+        signal_hub.start()
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+        position = signal_hub.current()
+        missed = []
+        if last_id:
+            try:
+                missed = load_signals(1000, after=resolve_cursor(last_id))
+            except KeyError:
+                pass # pruned or unknown: just follow from now on
+    except Exception:
+        stream_slots.release()
+        raise
+
+
+    def events(position):
+        sent = set()
+        for signal in missed:
+            sent.add(signal["id"])
+            yield f"id: {signal['id']}\nevent: signal\ndata: {json.dumps(signal)}\n\n"
+        yield "retry: 5000\n\n"
+        while True:
+            position, new = signal_hub.wait(position, STREAM_HEARTBEAT)
+            if not new:
+                yield ": keep-alive\n\n"
+                continue
+            for signal_id, payload in new:
+                if signal_id not in sent:
+                    yield f"id: {signal_id}\nevent: signal\ndata: {payload}\n\n"
+            sent.clear()
+
+    response = Response(events(position), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # let proxies pass events through unbuffered
+    })
+    # Runs when the client goes away (or the stream never started)
+    response.call_on_close(stream_slots.release)
+    return response
 
 @app.route('/dashboard', methods=['GET'])
 def dashboard():
@@ -404,108 +737,56 @@ def dashboard():
 
 @app.route('/tickers', methods=['GET'])
 def view_tickers():
-    try:
-        from b3_tickers import B3_TICKERS
-    except ImportError:
-        B3_TICKERS = {}
-        
-    sorted_tickers = sorted(B3_TICKERS.items())
-    
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>NotifyInvest - B3 Tickers</title>
-        <style>
-            body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #f0f2f5; margin: 0; padding: 20px; color: #333; }
-            .container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.05); }
-            h1 { margin-bottom: 20px; text-align: center; color: #1a1a1a; }
-            .search-box { width: 100%; padding: 12px; border: 1px solid #ddd; border-radius: 8px; margin-bottom: 20px; font-size: 1rem; box-sizing: border-box; }
-            table { width: 100%; border-collapse: collapse; }
-            th, td { text-align: left; padding: 12px; border-bottom: 1px solid #eee; }
-            th { background: #f8f9fa; position: sticky; top: 0; }
-            tr:hover { background: #f5f5f5; }
-            .count { text-align: center; color: #666; margin-bottom: 20px; }
-            .back-btn { display: inline-block; margin-bottom: 20px; color: #2196F3; text-decoration: none; font-weight: 500; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <a href="/dashboard" class="back-btn">← Back to Dashboard</a>
-            <h1>B3 Ticker Database</h1>
-            <div class="count">Tracking <strong>%d</strong> companies</div>
-            
-            <input type="text" id="search" class="search-box" placeholder="Search ticker or name..." onkeyup="filterTable()">
-            
-            <table id="tickerTable">
-                <thead>
-                    <tr>
-                        <th>Company / Key</th>
-                        <th>Ticker</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    %s
-                </tbody>
-            </table>
-        </div>
-
-        <script>
-            function filterTable() {
-                const input = document.getElementById('search');
-                const filter = input.value.toUpperCase();
-                const table = document.getElementById('tickerTable');
-                const tr = table.getElementsByTagName('tr');
-
-                for (let i = 1; i < tr.length; i++) {
-                    const tds = tr[i].getElementsByTagName('td');
-                    let show = false;
-                    for (let j = 0; j < tds.length; j++) {
-                        if (tds[j].textContent.toUpperCase().indexOf(filter) > -1) {
-                            show = true;
-                            break;
-                        }
-                    }
-                    tr[i].style.display = show ? '' : 'none';
-                }
-            }
-        </script>
-    </body>
-    </html>
-    """
-    
-    rows = ""
-    for key, value in sorted_tickers:
-        rows += f"<tr><td>{key}</td><td><strong>{value}</strong></td></tr>"
-        
-    return html % (len(B3_TICKERS), rows)
+    # ?q= : JSON prefix search (same as /api/tickers?q=), otherwise the precomputed page
+    if request.args.get('q') is not None:
+        return search_tickers()
+    etag = f"tickers-{ticker_catalog.version}"
+    return not_modified(etag) or tagged(precompressed(TICKERS_PAGE, TICKERS_PAGE_GZIP, 'text/html'), etag)
+
+@app.route('/api/tickers', methods=['GET'])
+def search_tickers():
+    """Whole ticker DB as [[name, ticker], ...], or prefix search results with ?q=&limit=."""
+    etag = f"tickers-{ticker_catalog.version}"
+    cached_response = not_modified(etag)
+    if cached_response:
+        return cached_response
+    query = request.args.get('q')
+    if query is None:
+        return tagged(precompressed(ticker_catalog.json, ticker_catalog.json_gzip, 'application/json'), etag)
+    limit = max(0, min(request.args.get('limit', SEARCH_LIMIT, type=int), 100))
+    return tagged(jsonify(ticker_catalog.search(query, limit)), etag)
 
 @app.route('/api/data', methods=['GET'])
 def get_dashboard_data():
-    # 1. Load Tokens
-    tokens = load_tokens()
-    
-    # 2. Load Signals (Recents)
-    signals = load_signals()
-    signals.reverse() # Newest first
-    
-    # 3. Load Monitor Status
-    status = {}
-    if os.path.exists(STATUS_FILE):
-        try:
-            with open(STATUS_FILE, 'r') as f:
-                status = json.load(f)
-        except:
-            status = {"message": "Error reading status file"}
-            
-    return jsonify({
-        "tokens": tokens,
-        "signals": signals[:50], # Send last 50 for dashboard
-        "status": status
-    })
+    # Counts, aggregates, recent signals and monitor status, kept up to date incrementally
+    try:
+        etag, body, body_gzip = dashboard_snapshot.get()
+    except Exception as e:
+        logger.error(f"Failed to build dashboard snapshot: {e}")
+        return jsonify({"error": "Dashboard data unavailable"}), 500
+    return not_modified(etag) or tagged(precompressed(body, body_gzip, 'application/json'), etag)
+
+@app.after_request
+def finish_response(response):
+    """ETag/304 and gzip for read responses (streams are left untouched)."""
+    if request.method != 'GET' or response.status_code != 200 or response.is_streamed:
+        return response
+    # Handlers tag their responses with a data version (see tagged); anything else gets
+    # a weak content ETag: the same validator holds for the plain and the gzipped body
+    response.add_etag(overwrite=False, weak=True)
+    response.make_conditional(request)
+    if response.status_code != 200:
+        return response # 304 Not Modified, no body
+
+    response.vary.add('Accept-Encoding')
+    if ('gzip' in request.headers.get('Accept-Encoding', '')
+            and response.mimetype in COMPRESSIBLE_TYPES
+            and 'Content-Encoding' not in response.headers
+            and response.content_length and response.content_length >= GZIP_MIN_SIZE):
+        response.set_data(gzip.compress(response.get_data(), GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 if __name__ == '__main__':
-    # Listen on all interfaces
-    app.run(host='0.0.0.0', port=5000)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=5000, threaded=True)
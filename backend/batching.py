@@ -0,0 +1,52 @@
+import threading
+import time
+
+# Micro-batching for the LLM analysis stage.
+# Matched items are collected and handed to the handler in groups: as soon as
+# max_size items are pending, or when the oldest pending item has waited `window`
+# seconds. During a news flood this turns dozens of serial Gemma round trips into
+# a few batched requests, while a lone item waits at most `window` seconds.
+BATCH_SIZE = 8
+BATCH_WINDOW = 3 # seconds
+
+
+class MicroBatcher:
+    def __init__(self, handler, max_size=BATCH_SIZE, window=BATCH_WINDOW):
+        self.handler = handler
+        self.max_size = max_size
+        self.window = window
+        self.lock = threading.Lock() # protects pending
+        self.flush_lock = threading.Lock() # one batch at a time, in arrival order
+        self.pending = []
+        self.first_added = None
+        t = threading.Thread(target=self._timer_loop, daemon=True)
+        t.start()
+
+    def add(self, item):
+        with self.lock:
+            self.pending.append(item)
+            if self.first_added is None:
+                self.first_added = time.monotonic()
+            full = len(self.pending) >= self.max_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Hands everything pending to the handler now (blocks until it is done)."""
+        with self.flush_lock:
+            with self.lock:
+                items, self.pending, self.first_added = self.pending, [], None
+            if not items:
+                return
+            try:
+                self.handler(items)
+            except Exception as e:
+                print(f"Batch handler failed ({len(items)} items): {e}")
+
+    def _timer_loop(self):
+        while True:
+            time.sleep(0.2)
+            with self.lock:
+                due = self.first_added is not None and time.monotonic() - self.first_added >= self.window
+            if due:
+                self.flush()
@@ -1,32 +1,33 @@
-import google.generativeai as genai
-import os
-
-import os
+import json
 
 try:
-    from secrets import GEMINI_API_KEY as API_KEY
+    from llm_cache import cache, content_key
+    from models import configure, get_model
 except ImportError:
-    from backend.secrets import GEMINI_API_KEY as API_KEY
-except:
-    API_KEY = os.getenv("GEMINI_API_KEY")
+    from backend.llm_cache import cache, content_key
+    from backend.models import configure, get_model
+
+ANALYSIS_MODEL = 'gemma-3-27b-it'
 
-if not API_KEY:
-    print("WARNING: Gemini API Key not found. Please set GEMINI_API_KEY env var or create backend/secrets.py")
+# Max items packed into one batched analysis request (keeps the prompt and the JSON answer small)
+BATCH_MAX_ITEMS = 8
 
 
 def configure_genai():
-    genai.configure(api_key=API_KEY)
+    configure()
 
 def analyze_news(ticker, title, summary):
     """
     Analyzes news using Gemma-3-27b-it.
     Returns analysis JSON.
     """
-    try:
-        model = genai.GenerativeModel('gemma-3-27b-it')
-    except Exception as e:
-        print(f"FATAL: Could not load 'gemma-3-27b-it'. {e}")
-        raise e
+    # Syndicated copies of the same story reuse the first analysis
+    cache_key = content_key(f"analysis:{ticker}", title, summary)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    model = get_model(ANALYSIS_MODEL)
     
     prompt = f"""
     You are a financial analyst specializing in the Brazilian Stock Market (B3).
@@ -54,11 +55,90 @@ def analyze_news(ticker, title, summary):
         response = model.generate_content(prompt)
         text = response.text.replace("```json", "").replace("```", "").strip()
         result = eval(text) 
+        cache.set(cache_key, result)
         return result
     except Exception as e:
         print(f"Error analyzing with Gemma: {e}")
         return {"signal": "HOLD", "sentiment": "NEUTRAL", "reason": "Erro na análise AI"}
 
+def analyze_news_batch(items):
+    """
+    Analyzes several news items with a single Gemma-3-27b-it request.
+    items: list of (ticker, title, summary).
+    Returns one analysis dict per item, in the same order.
+    """
+    results = [None] * len(items)
+    misses = []
+    for i, (ticker, title, summary) in enumerate(items):
+        cached = cache.get(content_key(f"analysis:{ticker}", title, summary))
+        if cached is not None:
+            results[i] = cached
+        else:
+            misses.append(i)
+
+    for start in range(0, len(misses), BATCH_MAX_ITEMS):
+        chunk = misses[start:start + BATCH_MAX_ITEMS]
+        if len(chunk) == 1:
+            i = chunk[0]
+            results[i] = analyze_news(*items[i])
+            continue
+
+        model = get_model(ANALYSIS_MODEL)
+
+        news_block = "\n".join(
+            f"""
+    Item {n}:
+    Company: {items[i][0]}
+    News Title: {items[i][1]}
+    News Summary: {items[i][2]}"""
+            for n, i in enumerate(chunk, start=1)
+        )
+
+        prompt = f"""
+    You are a financial analyst specializing in the Brazilian Stock Market (B3).
+    Analyze each of the following {len(chunk)} news items, each related to the company given with it.
+    {news_block}
+    
+    Task, for EACH item independently:
+    1. Determine the sentiment of the news regarding its company (POSITIVE, NEGATIVE, NEUTRAL).
+    2. Suggest a trading signal (BUY, SELL, HOLD). Be conservative.
+    3. Estimate the potential short-term price impact as a percentage (e.g. "+2%", "-5%", "0%").
+    4. Provide a very short reason (max 1 sentence) in Portuguese.
+    
+    Output format (JSON array only, exactly one object per item, using the item number as "id"):
+    [
+        {{
+            "id": 1,
+            "signal": "BUY/SELL/HOLD",
+            "sentiment": "POSITIVE/NEGATIVE/NEUTRAL",
+            "impact": "+/-X%",
+            "reason": "Resumo do motivo em pt-br"
+        }}
+    ]
+    """
+
+        by_id = {}
+        try:
+            response = model.generate_content(prompt)
+            text = response.text.replace("```json", "").replace("```", "").strip()
+            for entry in json.loads(text):
+                if isinstance(entry, dict) and "id" in entry:
+                    by_id[int(entry.pop("id"))] = entry
+        except Exception as e:
+            print(f"Error analyzing batch with Gemma: {e}")
+
+        for n, i in enumerate(chunk, start=1):
+            result = by_id.get(n)
+            if result is None or "signal" not in result:
+                # Item missing from the batch answer: fall back to a single request
+                results[i] = analyze_news(*items[i])
+                continue
+            ticker, title, summary = items[i]
+            cache.set(content_key(f"analysis:{ticker}", title, summary), result)
+            results[i] = result
+
+    return results
+
 if __name__ == "__main__":
     print("Testing Brain (Gemma-3-27b)...")
     configure_genai()
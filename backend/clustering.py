@@ -0,0 +1,137 @@
+import hashlib
+import random
+import re
+import time
+import unicodedata
+from collections import deque
+
+try:
+    from prefilter import find_candidates
+except ImportError:
+    from backend.prefilter import find_candidates
+
+# Near-duplicate story detection.
+# Every headline gets a MinHash sketch over its words and word pairs. Sketches are
+# bucketed with LSH banding, so a new headline is only compared with headlines that
+# share at least one band. Headlines that look alike (estimated Jaccard >= threshold)
+# are folded into the same story cluster. Only the recent window is kept in memory.
+# Template headlines ("X anuncia dividendos de R$ 1,50 por ação") look alike for every
+# company, so the companies a headline mentions are part of the story key: headlines
+# are only compared with headlines about exactly the same companies.
+# A cluster only suppresses later copies once its first copy went through matching
+# (handled); until then the next copy is processed again.
+NUM_PERM = 96
+BANDS = 32 # 32 bands x 3 rows: ~99% chance to find pairs at Jaccard 0.5, few candidates below 0.3
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.5
+WINDOW_SECONDS = 24 * 3600
+MAX_ITEMS = 2000
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(42) # fixed seed: sketches stay comparable across restarts
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# Words that carry no meaning for "is this the same story" in Portuguese headlines
+STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "um", "uma", "para", "por", "com", "que", "se", "ao", "aos", "r", "us", "diz", "apos",
+}
+
+
+def companies(text):
+    """
+    The companies a headline mentions, as B3 issuer codes (first 4 letters of the ticker),
+    so "Petrobras", "PETR3" and "PETR4" are the same company.
+    """
+    return frozenset(ticker[:4] for tickers in find_candidates(text).values() for ticker in tickers)
+
+
+def _features(text):
+    text = unicodedata.normalize('NFKD', text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    words = [w for w in re.findall(r"[a-z0-9]+", text) if w not in STOPWORDS]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(text):
+    """MinHash signature (tuple of NUM_PERM ints) of the headline's word set."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'big')
+        for f in _features(text)
+    ]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class StoryClusterer:
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, window=WINDOW_SECONDS, max_items=MAX_ITEMS):
+        self.threshold = threshold
+        self.window = window
+        self.max_items = max_items
+        self.items = deque() # (timestamp, signature, cluster, companies), oldest first
+        self.buckets = {} # (companies, band, band_hash) -> [item, ...]
+
+    def _bands(self, sig, company_codes):
+        # Keyed by the company set: other companies' headlines are never candidates
+        return [(company_codes, i, hash(sig[i * ROWS:(i + 1) * ROWS])) for i in range(BANDS)]
+
+    def _expire(self):
+        cutoff = time.time() - self.window
+        while self.items and (len(self.items) > self.max_items or self.items[0][0] < cutoff):
+            item = self.items.popleft()
+            for band in self._bands(item[1], item[3]):
+                bucket = self.buckets.get(band)
+                if bucket:
+                    bucket.remove(item)
+                    if not bucket:
+                        del self.buckets[band]
+
+    def assign(self, title, link, source_name):
+        """
+        Puts the headline in a story cluster.
+        Returns (cluster, is_duplicate). cluster is a dict with the story's
+        sources, the id of the signal it produced (signal_id), if any, and whether
+        a copy went through matching (handled, see mark_handled()). A copy of a
+        story that is not handled yet is not a duplicate: it joins the cluster but
+        is processed again.
+        """
+        self._expire()
+        source = {"name": source_name, "url": link}
+        company_codes = companies(title)
+        sig = minhash(title)
+        if sig is None:
+            return {"signal_id": None, "sources": [source], "handled": False}, False
+
+        bands = self._bands(sig, company_codes)
+        best, best_score = None, 0.0
+        checked = set()
+        for band in bands:
+            for item in self.buckets.get(band, ()):
+                if id(item) in checked:
+                    continue
+                checked.add(id(item))
+                score = similarity(sig, item[1])
+                if score > best_score:
+                    best, best_score = item, score
+
+        if best is not None and best_score >= self.threshold:
+            cluster = best[2]
+            cluster["sources"].append(source)
+            return cluster, cluster["handled"]
+
+        cluster = {"signal_id": None, "sources": [source], "handled": False}
+        item = (time.time(), sig, cluster, company_codes)
+        self.items.append(item)
+        for band in bands:
+            self.buckets.setdefault(band, []).append(item)
+        return cluster, False
+
+    def mark_handled(self, cluster):
+        """The story went through matching: later copies are duplicates from now on."""
+        cluster["handled"] = True
@@ -0,0 +1,132 @@
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+try:
+    import db
+except ImportError:
+    from backend import db
+
+# Snapshot behind the dashboard's /api/data.
+# Instead of loading every token and signal per request, the snapshot keeps running
+# aggregates (signals per type, per ticker and per source) and the pieces the page
+# shows, and updates only the part whose version moved: new signal rows are folded into
+# the counters (a full rebuild happens only after pruning), tokens are re-counted when
+# their revision changes, and status.json is re-read when its mtime changes. The
+# payload is serialized (and gzipped) once per change, so a request is a lookup.
+CHECK_INTERVAL = 1.0 # seconds between version checks
+RECENT_SIGNALS = 50
+RECENT_TOKENS = 10
+TOKEN_PREVIEW = 20 # characters of each token shown on the dashboard
+
+
+def _signal_type(title):
+    """Signal titles look like "PETR4: BUY"."""
+    return title.split(':', 1)[1].strip().upper() if ':' in title else "OTHER"
+
+
+class DashboardSnapshot:
+    def __init__(self, status_file, check_interval=CHECK_INTERVAL):
+        self.status_file = status_file
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.versions = {"tokens": None, "signals": None, "status": None}
+        # Signal aggregates, folded in as rows arrive
+        self.deletes = None # 'signal_deletes' revision the counters were built at
+        self.last_seq = 0
+        self.by_signal = Counter()
+        self.by_ticker = {} # ticker -> Counter of signal types
+        self.by_source = Counter()
+        self.signals = []
+        self.tokens = {"count": 0, "recent": []}
+        self.status = {}
+        self.state = None # (etag, body, gzipped body), replaced as a whole
+
+    def _reset_signals(self):
+        self.last_seq = 0
+        self.by_signal = Counter()
+        self.by_ticker = {}
+        self.by_source = Counter()
+
+    def _update_signals(self):
+        deletes = db.get_revision('signal_deletes')
+        if deletes != self.deletes:
+            self._reset_signals() # pruned: rebuild the counters from what is left
+            self.deletes = deletes
+        for seq, ticker, title, source_name in db.get_signal_summaries(self.last_seq):
+            signal = _signal_type(title)
+            self.by_signal[signal] += 1
+            self.by_ticker.setdefault(ticker or "-", Counter())[signal] += 1
+            self.by_source[source_name or "-"] += 1
+            self.last_seq = seq
+        self.signals = db.get_signals(RECENT_SIGNALS)
+        self.signals.reverse() # Newest first
+
+    def _update_tokens(self):
+        self.tokens = {
+            "count": db.count_tokens(),
+            "recent": [token[:TOKEN_PREVIEW] for token in db.get_recent_tokens(RECENT_TOKENS)],
+        }
+
+    def _update_status(self):
+        status = {}
+        if os.path.exists(self.status_file):
+            try:
+                with open(self.status_file, 'r') as f:
+                    status = json.load(f)
+            except:
+                status = {"message": "Error reading status file"}
+        self.status = status
+
+    def _status_version(self):
+        try:
+            return os.stat(self.status_file).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _refresh(self):
+        # Versions are read before the data, so the tag never claims more than the payload holds
+        versions = {
+            "tokens": db.get_revision('tokens'),
+            "signals": db.get_revision('signals'),
+            "status": self._status_version(),
+        }
+        changed = [name for name, version in versions.items() if version != self.versions[name]]
+        if "signals" in changed:
+            self._update_signals()
+        if "tokens" in changed:
+            self._update_tokens()
+        if "status" in changed:
+            self._update_status()
+        if changed or self.state is None:
+            body = json.dumps({
+                "tokens": self.tokens,
+                "signals": self.signals, # Send last 50 for dashboard
+                "status": self.status,
+                "stats": {
+                    "signals": sum(self.by_signal.values()),
+                    "by_signal": self.by_signal,
+                    "by_ticker": self.by_ticker,
+                    "by_source": self.by_source,
+                },
+            }).encode('utf-8')
+            etag = f"data-{versions['tokens']}-{versions['signals']}-{versions['status']}"
+            self.state = (etag, body, gzip.compress(body, 6))
+            self.versions = versions
+        self.checked = time.time()
+
+    def get(self):
+        """Returns (etag, JSON body, gzipped body) of the current snapshot."""
+        if time.time() - self.checked > self.check_interval:
+            # Only one request refreshes; the others keep serving the current snapshot
+            if self.lock.acquire(blocking=self.state is None):
+                try:
+                    if time.time() - self.checked > self.check_interval:
+                        self._refresh()
+                finally:
+                    self.lock.release()
+        return self.state
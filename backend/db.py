@@ -0,0 +1,395 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Shared storage for api.py and monitor.py.
+# Signals, registered tokens and their preferences live in one SQLite database in
+# WAL mode: readers never block the writer, every write is a single-row transaction
+# (no more whole-file JSON rewrites), and the two services cannot overwrite each
+# other's updates. Each table has a revision counter, bumped by triggers on every
+# change, so readers can cheaply tell whether anything changed.
+# Signals are an append-only log: a new signal is one INSERT, and later outlets
+# carrying the same story are appended to signal_sources instead of rewriting the
+# signal. Old history is removed by prune_signals() from time to time, by age and count.
+# Searches use an FTS5 index (signals_fts) kept in sync by triggers. Its tokenizer
+# folds case and accents, so "acao" finds "Ação".
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.join(BASE_DIR, "notifyinvest.db")
+# Legacy JSON files, imported once into an empty database
+LEGACY_SIGNALS_FILE = os.path.join(BASE_DIR, "signals.json")
+LEGACY_TOKENS_FILE = os.path.join(BASE_DIR, "tokens.json")
+
+SIGNAL_RETENTION = 365 * 24 * 3600 # drop signals older than a year...
+MAX_SIGNALS = 100000 # ...or beyond the newest 100k
+PRUNE_INTERVAL = 24 * 3600 # how often the monitor runs prune_signals()
+
+DEFAULT_PREFS = {"min_buy": 0, "min_sell": 0, "whitelist": [], "blacklist": [], "source_whitelist": []}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    data TEXT,
+    ticker TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_signals_timestamp ON signals(timestamp);
+CREATE INDEX IF NOT EXISTS idx_signals_ticker ON signals(ticker);
+
+-- Extra outlets for a signal, appended as duplicates of the story show up
+CREATE TABLE IF NOT EXISTS signal_sources (
+    signal_id TEXT NOT NULL,
+    name TEXT,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_signal_sources_signal ON signal_sources(signal_id);
+
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT PRIMARY KEY,
+    prefs TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tokens_created ON tokens(created);
+
+CREATE TABLE IF NOT EXISTS revisions (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO revisions (name, value) VALUES ('signals', 0), ('tokens', 0), ('signal_deletes', 0);
+
+CREATE TRIGGER IF NOT EXISTS signals_ins AFTER INSERT ON signals
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'signals'; END;
+CREATE TRIGGER IF NOT EXISTS signals_upd AFTER UPDATE ON signals
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'signals'; END;
+CREATE TRIGGER IF NOT EXISTS signals_del AFTER DELETE ON signals
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'signals'; END;
+-- Separate counter for deletions (pruning), for readers that fold new rows into aggregates
+CREATE TRIGGER IF NOT EXISTS signals_del_count AFTER DELETE ON signals
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'signal_deletes'; END;
+CREATE TRIGGER IF NOT EXISTS signal_sources_ins AFTER INSERT ON signal_sources
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'signals'; END;
+
+-- Full-text index over signals (rowid = signals.seq); sources holds the outlet names
+CREATE VIRTUAL TABLE IF NOT EXISTS signals_fts USING fts5(
+    title, body, sources, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS signals_fts_ins AFTER INSERT ON signals
+BEGIN INSERT INTO signals_fts (rowid, title, body, sources) VALUES (new.seq, new.title, new.body, SOURCE_NAMES(new.data)); END;
+CREATE TRIGGER IF NOT EXISTS signals_fts_del AFTER DELETE ON signals
+BEGIN DELETE FROM signals_fts WHERE rowid = old.seq; END;
+CREATE TRIGGER IF NOT EXISTS signal_sources_fts AFTER INSERT ON signal_sources
+BEGIN
+    UPDATE signals_fts SET sources = sources || ' ' || IFNULL(new.name, '')
+    WHERE rowid = (SELECT seq FROM signals WHERE id = new.signal_id);
+END;
+CREATE TRIGGER IF NOT EXISTS tokens_ins AFTER INSERT ON tokens
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'tokens'; END;
+CREATE TRIGGER IF NOT EXISTS tokens_upd AFTER UPDATE ON tokens
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'tokens'; END;
+CREATE TRIGGER IF NOT EXISTS tokens_del AFTER DELETE ON tokens
+BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'tokens'; END;
+"""
+
+# Outlet names stored in a signal's data JSON (source_name and data.sources[].name)
+SOURCE_NAMES_SQL = """IFNULL(json_extract({data}, '$.source_name'), '') || ' ' ||
+    IFNULL((SELECT group_concat(json_extract(value, '$.name'), ' ') FROM json_each({data}, '$.sources')), '')"""
+SCHEMA = SCHEMA.replace("SOURCE_NAMES(new.data)", SOURCE_NAMES_SQL.format(data="new.data"))
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    db = sqlite3.connect(DB_FILE, timeout=30)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def get_db():
+    """Returns this thread's connection, creating the schema on first use."""
+    global _initialized
+    db = getattr(_local, 'db', None)
+    if db is None:
+        db = _connect()
+        _local.db = db
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                db.executescript(SCHEMA)
+                _migrate_legacy_json(db)
+                _backfill_search_index(db)
+                _initialized = True
+    return db
+
+
+@contextmanager
+def transaction():
+    """Write transaction that takes the lock up front, so read-modify-write cannot lose updates."""
+    db = get_db()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+
+def _migrate_legacy_json(db):
+    """One-time import of signals.json / tokens.json into an empty database."""
+    db.execute("BEGIN IMMEDIATE") # the other service may be starting at the same time
+    try:
+        if db.execute("SELECT COUNT(*) FROM signals").fetchone()[0] == 0 and os.path.exists(LEGACY_SIGNALS_FILE):
+            try:
+                with open(LEGACY_SIGNALS_FILE, 'r') as f:
+                    signals = json.load(f)
+            except:
+                signals = []
+            for s in signals:
+                db.execute(
+                    "INSERT OR IGNORE INTO signals (id, title, body, data, ticker, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                    (s.get('id') or str(uuid.uuid4()), s.get('title', ''), s.get('body', ''),
+                     json.dumps(s.get('data')), _ticker_of(s.get('title', '')), s.get('timestamp', time.time())),
+                )
+            print(f"Imported {len(signals)} signals from {LEGACY_SIGNALS_FILE}")
+        if db.execute("SELECT COUNT(*) FROM tokens").fetchone()[0] == 0 and os.path.exists(LEGACY_TOKENS_FILE):
+            try:
+                with open(LEGACY_TOKENS_FILE, 'r') as f:
+                    tokens = json.load(f)
+            except:
+                tokens = {}
+            if isinstance(tokens, list):
+                tokens = {t: {} for t in tokens}
+            now = time.time()
+            for token, prefs in tokens.items():
+                db.execute("INSERT OR IGNORE INTO tokens (token, prefs, created) VALUES (?, ?, ?)",
+                           (token, json.dumps({**DEFAULT_PREFS, **prefs}), now))
+            print(f"Imported {len(tokens)} tokens from {LEGACY_TOKENS_FILE}")
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+
+def _backfill_search_index(db):
+    """Indexes signals stored before signals_fts existed."""
+    with db:
+        db.execute(
+            "INSERT INTO signals_fts (rowid, title, body, sources) "
+            f"SELECT s.seq, s.title, s.body, {SOURCE_NAMES_SQL.format(data='s.data')} || ' ' || "
+            "IFNULL((SELECT group_concat(x.name, ' ') FROM signal_sources x WHERE x.signal_id = s.id), '') "
+            "FROM signals s WHERE s.seq > (SELECT IFNULL(MAX(rowid), 0) FROM signals_fts)"
+        )
+
+
+def _match_expression(text, column=None):
+    """
+    Turns free text into a safe FTS5 query: every word must appear, the last one as a prefix
+    ("petro" finds "Petrobras"). With column set, the words must appear there as a phrase.
+    """
+    words = [w.replace('"', '') for w in text.split()]
+    words = [w for w in words if w]
+    if not words:
+        return None
+    if column:
+        return f'{column} : "{" ".join(words)}"'
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return " AND ".join(terms)
+
+
+def _ticker_of(title):
+    """Signal titles look like "PETR4: BUY"."""
+    return title.split(':')[0].strip().upper() if ':' in title else None
+
+
+# Signal columns plus the appended sources as a JSON array (NULL when there are none)
+SIGNAL_COLUMNS = """s.seq, s.id, s.title, s.body, s.data, s.timestamp,
+    (SELECT json_group_array(json_object('name', x.name, 'url', x.url))
+     FROM signal_sources x WHERE x.signal_id = s.id) AS extra_sources"""
+
+
+def _signal_from_row(row):
+    data = json.loads(row["data"]) if row["data"] else None
+    extra = json.loads(row["extra_sources"]) if row["extra_sources"] else []
+    if extra:
+        data = data if isinstance(data, dict) else {}
+        data["sources"] = data.get("sources", []) + extra
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "body": row["body"],
+        "data": data,
+        "timestamp": row["timestamp"],
+    }
+
+
+def get_revision(name):
+    """Change counter of a table ('signals' or 'tokens'), bumped on every write; 'signal_deletes' counts deletions only."""
+    row = get_db().execute("SELECT value FROM revisions WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+# --- Signals ---
+
+def insert_signal(title, body, data, timestamp=None):
+    """Stores a new signal and returns its id."""
+    signal_id = str(uuid.uuid4())
+    with get_db() as db:
+        db.execute(
+            "INSERT INTO signals (id, title, body, data, ticker, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            (signal_id, title, body, json.dumps(data), _ticker_of(title), timestamp or time.time()),
+        )
+    return signal_id
+
+
+def add_signal_source(signal_id, source):
+    """Appends another outlet to data.sources of an existing signal (the signal row is not rewritten)."""
+    with get_db() as db:
+        db.execute("INSERT INTO signal_sources (signal_id, name, url) VALUES (?, ?, ?)",
+                   (signal_id, source.get("name"), source.get("url")))
+
+
+def prune_signals(max_age=SIGNAL_RETENTION, max_count=MAX_SIGNALS):
+    """Applies the retention policy: drops signals older than max_age or beyond the newest max_count."""
+    with transaction() as db:
+        cur = db.execute(
+            "DELETE FROM signals WHERE timestamp < ? OR seq <= (SELECT MAX(seq) FROM signals) - ?",
+            (time.time() - max_age, max_count),
+        )
+        removed = cur.rowcount
+        if removed:
+            db.execute("DELETE FROM signal_sources WHERE signal_id NOT IN (SELECT id FROM signals)")
+    if removed:
+        # Hand the freed pages back to the main file and reset the WAL
+        get_db().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return removed
+
+
+def get_signal_seq(signal_id):
+    """Position of a signal in the log (its seq), or None if unknown or pruned."""
+    row = get_db().execute("SELECT seq FROM signals WHERE id = ?", (signal_id,)).fetchone()
+    return row[0] if row else None
+
+
+def get_last_seq():
+    """Position of the newest signal in the log (0 when empty)."""
+    return get_db().execute("SELECT IFNULL(MAX(seq), 0) FROM signals").fetchone()[0]
+
+
+def get_seq_at(timestamp, newer=False):
+    """
+    Translates a time into a log position: the last seq recorded at or before timestamp,
+    or with newer=True the first seq at or after it. 0 / None when there is none.
+    """
+    if newer:
+        row = get_db().execute("SELECT MIN(seq) FROM signals WHERE timestamp >= ?", (timestamp,)).fetchone()
+        return row[0]
+    row = get_db().execute("SELECT MAX(seq) FROM signals WHERE timestamp <= ?", (timestamp,)).fetchone()
+    return row[0] or 0
+
+
+def get_signal_summaries(after=0):
+    """(seq, ticker, title, source_name) of the signals after seq, oldest first. For aggregates."""
+    return get_db().execute(
+        "SELECT seq, ticker, title, json_extract(data, '$.source_name') FROM signals WHERE seq > ? ORDER BY seq",
+        (after,),
+    ).fetchall()
+
+
+def get_signals(limit=50, search=None, ticker=None, source=None, start=None, end=None, after=None, before=None):
+    """
+    Newest `limit` signals, oldest first. Optional filters:
+    search: words in title/body (case and accent insensitive), ticker: exact ticker,
+    source: outlet name, start/end: unix timestamps (inclusive).
+    Cursors are log positions (see get_signal_seq): before pages back through history,
+    after returns the oldest `limit` signals newer than it, for delta sync.
+    """
+    sql = f"SELECT {SIGNAL_COLUMNS} FROM signals s"
+    where, params = [], []
+    match = [m for m in (_match_expression(search or ''), _match_expression(source or '', 'sources')) if m]
+    if match:
+        sql += " JOIN signals_fts ON signals_fts.rowid = s.seq"
+        where.append("signals_fts MATCH ?")
+        params.append(" AND ".join(f"({m})" for m in match))
+    if ticker:
+        where.append("s.ticker = ?")
+        params.append(ticker.strip().upper())
+    if start is not None:
+        where.append("s.timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("s.timestamp <= ?")
+        params.append(end)
+    if after is not None:
+        where.append("s.seq > ?")
+        params.append(after)
+    if before is not None:
+        where.append("s.seq < ?")
+        params.append(before)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY s.seq LIMIT ?" if after is not None else " ORDER BY s.seq DESC LIMIT ?"
+    params.append(limit)
+    rows = get_db().execute(sql, params).fetchall()
+    if after is None:
+        rows.reverse()
+    return [_signal_from_row(row) for row in rows]
+
+
+# --- Tokens / preferences ---
+
+def load_tokens():
+    """All registered tokens: {token: prefs}."""
+    rows = get_db().execute("SELECT token, prefs FROM tokens").fetchall()
+    return {row["token"]: json.loads(row["prefs"]) for row in rows}
+
+
+def get_prefs(token):
+    row = get_db().execute("SELECT prefs FROM tokens WHERE token = ?", (token,)).fetchone()
+    return json.loads(row["prefs"]) if row else None
+
+
+def register_token(token):
+    """Adds a token with default preferences. Returns True if it was new."""
+    with transaction() as db:
+        cur = db.execute("INSERT OR IGNORE INTO tokens (token, prefs, created) VALUES (?, ?, ?)",
+                         (token, json.dumps(DEFAULT_PREFS), time.time()))
+    return cur.rowcount == 1
+
+
+def update_prefs(token, changes):
+    """Merges changes into a token's preferences. Returns the new preferences, or None if unknown."""
+    with transaction() as db:
+        row = db.execute("SELECT prefs FROM tokens WHERE token = ?", (token,)).fetchone()
+        if row is None:
+            return None
+        prefs = json.loads(row["prefs"])
+        prefs.update(changes)
+        db.execute("UPDATE tokens SET prefs = ? WHERE token = ?", (json.dumps(prefs), token))
+    return prefs
+
+
+def remove_tokens(tokens):
+    with transaction() as db:
+        cur = db.executemany("DELETE FROM tokens WHERE token = ?", [(t,) for t in tokens])
+    return cur.rowcount
+
+
+def count_tokens():
+    return get_db().execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+
+def get_recent_tokens(limit=10):
+    """The most recently registered tokens, newest first."""
+    rows = get_db().execute("SELECT token FROM tokens ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+    return [row[0] for row in rows]
@@ -0,0 +1,293 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+try:
+    from push import send_push_batch, check_receipts, PUSH_CHUNK_SIZE, RECEIPT_CHUNK_SIZE, PUSH_TIMEOUT
+except ImportError:
+    from backend.push import send_push_batch, check_receipts, PUSH_CHUNK_SIZE, RECEIPT_CHUNK_SIZE, PUSH_TIMEOUT
+
+# Asynchronous push delivery.
+# The monitor only inserts jobs into a local SQLite queue (push_queue.db) and moves on;
+# a small pool of worker threads drains it in Expo-sized batches. Failed sends are
+# retried with exponential backoff, each token is rate limited, and jobs survive a
+# restart (a claimed job whose worker died is picked up again when its lease expires).
+# A worker only starts a send that can finish inside its lease; jobs it has no time
+# left for are handed back unclaimed, so another worker does not send them again.
+# Ticket ids are kept so a background checker can poll Expo's receipts later and
+# report devices that no longer exist (DeviceNotRegistered) for removal.
+QUEUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "push_queue.db")
+NUM_WORKERS = 2
+LEASE_SECONDS = 60 # a claimed job is retried if not finished within this time
+SEND_BUDGET = 2 * PUSH_TIMEOUT + 5 # longest a send can take (connect + read), plus slack
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 5 # seconds, doubled on every failed attempt
+BACKOFF_MAX = 15 * 60
+PER_TOKEN_INTERVAL = 2 # min seconds between two pushes to the same device
+RECEIPT_DELAY = 15 * 60 # Expo recommends waiting ~15 min before asking for receipts
+RECEIPT_MAX_AGE = 24 * 3600 # Expo keeps receipts for a day, give up after that
+RECEIPT_POLL_INTERVAL = 60
+LATENCY_SAMPLES = 1000
+
+# Expo errors that will not go away by retrying
+PERMANENT_ERRORS = {"DeviceNotRegistered", "MessageTooBig", "InvalidCredentials", "MismatchSenderId"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS push_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token TEXT NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    data TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    claimed_until REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_push_jobs_next ON push_jobs(next_attempt);
+CREATE TABLE IF NOT EXISTS push_receipts (
+    ticket_id TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    sent REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_push_receipts_sent ON push_receipts(sent);
+"""
+
+
+class PushDispatcher:
+    def __init__(self, path=QUEUE_FILE, on_dead_tokens=None):
+        """on_dead_tokens(tokens) is called with devices Expo reports as no longer registered."""
+        self.path = path
+        self.on_dead_tokens = on_dead_tokens
+        self.local = threading.local()
+        self.wakeup = threading.Event()
+        self.rate_lock = threading.Lock()
+        self.last_sent = {} # token -> time of the last push
+        self.stats_lock = threading.Lock()
+        self.counters = {
+            "enqueued": 0, "sent": 0, "retried": 0, "dropped": 0,
+            "receipts_ok": 0, "receipts_error": 0, "dead_tokens": 0,
+        }
+        self.latencies = deque(maxlen=LATENCY_SAMPLES) # seconds from enqueue to accepted by Expo
+        with self._db() as db:
+            db.executescript(SCHEMA)
+
+    def _db(self):
+        """One connection per thread (sqlite3 connections cannot be shared)."""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return db
+
+    def _count(self, key, n=1):
+        with self.stats_lock:
+            self.counters[key] += n
+
+    def enqueue(self, tokens, title, body, data=None):
+        """Queues one push per token. Returns immediately."""
+        now = time.time()
+        payload = json.dumps(data) if data is not None else None
+        rows = [(token, title, body, payload, now, now) for token in dict.fromkeys(tokens) if token]
+        if not rows:
+            return 0
+        with self._db() as db:
+            db.executemany(
+                "INSERT INTO push_jobs (token, title, body, data, next_attempt, created) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._count("enqueued", len(rows))
+        self.wakeup.set()
+        return len(rows)
+
+    def _claim(self):
+        """Leases up to one Expo chunk of due jobs, skipping rate-limited tokens. Returns (jobs, lease end)."""
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT id, token, title, body, data, attempts, created FROM push_jobs "
+                "WHERE next_attempt <= ? AND claimed_until < ? ORDER BY next_attempt LIMIT ?",
+                (now, now, PUSH_CHUNK_SIZE * 2),
+            ).fetchall()
+            jobs, deferred = [], []
+            with self.rate_lock:
+                for row in rows:
+                    token = row[1]
+                    ready_at = self.last_sent.get(token, 0) + PER_TOKEN_INTERVAL
+                    if ready_at > now or any(job[1] == token for job in jobs):
+                        deferred.append((max(ready_at, now + PER_TOKEN_INTERVAL), row[0]))
+                    elif len(jobs) < PUSH_CHUNK_SIZE:
+                        jobs.append(row)
+                        self.last_sent[token] = now
+            db.executemany("UPDATE push_jobs SET claimed_until = ? WHERE id = ?",
+                           [(now + LEASE_SECONDS, job[0]) for job in jobs])
+            db.executemany("UPDATE push_jobs SET next_attempt = ? WHERE id = ?", deferred)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return jobs, now + LEASE_SECONDS
+
+    def _prune(self, tokens):
+        """Drops queued pushes for dead devices and hands them to on_dead_tokens."""
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return
+        print(f"Pruning {len(tokens)} unregistered device(s)")
+        self._count("dead_tokens", len(tokens))
+        with self._db() as db:
+            db.executemany("DELETE FROM push_jobs WHERE token = ?", [(t,) for t in tokens])
+            db.executemany("DELETE FROM push_receipts WHERE token = ?", [(t,) for t in tokens])
+        if self.on_dead_tokens:
+            try:
+                self.on_dead_tokens(tokens)
+            except Exception as e:
+                print(f"Failed to remove dead tokens: {e}")
+
+    def _deliver(self, jobs, lease_until):
+        # Jobs of the same signal share their message: one batch call per message
+        groups = {}
+        receipts, dead, latencies = [], [], []
+        for job in jobs:
+            groups.setdefault((job[2], job[3], job[4]), []).append(job)
+
+        done, retry, released = [], [], []
+        now = time.time()
+        for (title, body, data), group in groups.items():
+            if time.time() + SEND_BUDGET > lease_until:
+                # Not enough lease left to finish this send: hand the jobs back untouched
+                released.extend(job[0] for job in group)
+                continue
+            try:
+                results = send_push_batch([job[1] for job in group], title, body,
+                                          data=json.loads(data) if data else None)
+            except Exception as e:
+                print(f"Push batch failed: {e}")
+                results = {}
+            sent_at = time.time()
+            for job in group:
+                result = results.get(job[1], {"status": "error", "message": "no result", "error": None})
+                if result["status"] == "ok":
+                    done.append(job[0])
+                    self._count("sent")
+                    latencies.append(sent_at - job[6])
+                    if result.get("id"):
+                        receipts.append((result["id"], job[1], sent_at))
+                elif result.get("error") == "DeviceNotRegistered":
+                    done.append(job[0])
+                    dead.append(job[1])
+                elif result.get("error") in PERMANENT_ERRORS or job[5] + 1 >= MAX_ATTEMPTS:
+                    print(f"Dropping push to {job[1]} after {job[5] + 1} attempts: {result.get('error') or result.get('message')}")
+                    done.append(job[0])
+                    self._count("dropped")
+                else:
+                    delay = min(BACKOFF_BASE * 2 ** job[5], BACKOFF_MAX)
+                    retry.append((now + delay, job[0]))
+                    self._count("retried")
+
+        with self._db() as db:
+            db.executemany("DELETE FROM push_jobs WHERE id = ?", [(job_id,) for job_id in done])
+            db.executemany(
+                "UPDATE push_jobs SET attempts = attempts + 1, next_attempt = ?, claimed_until = 0 WHERE id = ?",
+                retry,
+            )
+            db.executemany("UPDATE push_jobs SET claimed_until = 0 WHERE id = ?", [(job_id,) for job_id in released])
+            db.executemany("INSERT OR REPLACE INTO push_receipts (ticket_id, token, sent) VALUES (?, ?, ?)", receipts)
+        with self.stats_lock:
+            self.latencies.extend(latencies)
+        self._prune(dead)
+
+    def check_receipts_once(self):
+        """Polls Expo for receipts of tickets older than RECEIPT_DELAY. Returns the number resolved."""
+        now = time.time()
+        db = self._db()
+        rows = db.execute(
+            "SELECT ticket_id, token, sent FROM push_receipts WHERE sent <= ? ORDER BY sent LIMIT ?",
+            (now - RECEIPT_DELAY, RECEIPT_CHUNK_SIZE),
+        ).fetchall()
+        if not rows:
+            return 0
+        receipts = check_receipts([row[0] for row in rows])
+
+        resolved, dead = [], []
+        for ticket_id, token, sent in rows:
+            receipt = receipts.get(ticket_id)
+            if receipt is None:
+                if now - sent > RECEIPT_MAX_AGE:
+                    resolved.append(ticket_id) # Expo no longer has it
+                continue
+            resolved.append(ticket_id)
+            if receipt["status"] == "ok":
+                self._count("receipts_ok")
+            else:
+                self._count("receipts_error")
+                if receipt.get("error") == "DeviceNotRegistered":
+                    dead.append(token)
+                else:
+                    print(f"Push receipt error for {token}: {receipt.get('error') or receipt.get('message')}")
+        with db:
+            db.executemany("DELETE FROM push_receipts WHERE ticket_id = ?", [(t,) for t in resolved])
+        self._prune(dead)
+        return len(resolved)
+
+    def _receipt_loop(self):
+        while True:
+            try:
+                # Keep going while there is a backlog, otherwise wait for the next poll
+                if self.check_receipts_once() >= RECEIPT_CHUNK_SIZE:
+                    continue
+            except Exception as e:
+                print(f"Receipt checker error: {e}")
+            time.sleep(RECEIPT_POLL_INTERVAL)
+
+    def _next_due_in(self):
+        row = self._db().execute("SELECT MIN(MAX(next_attempt, claimed_until)) FROM push_jobs").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _worker_loop(self):
+        while True:
+            try:
+                jobs, lease_until = self._claim()
+                if jobs:
+                    self._deliver(jobs, lease_until)
+                    continue
+                wait = self._next_due_in()
+            except Exception as e:
+                print(f"Push worker error: {e}")
+                wait = 5
+            # Sleep until the next job is due or a new one is enqueued
+            self.wakeup.wait(timeout=min(wait, 30) if wait is not None else 30)
+            self.wakeup.clear()
+
+    def start(self, workers=NUM_WORKERS):
+        for i in range(workers):
+            t = threading.Thread(target=self._worker_loop, name=f"push-worker-{i}", daemon=True)
+            t.start()
+        t = threading.Thread(target=self._receipt_loop, name="push-receipts", daemon=True)
+        t.start()
+
+    def stats(self):
+        with self.stats_lock:
+            stats = dict(self.counters)
+            latencies = sorted(self.latencies)
+        if latencies:
+            stats["latency_avg"] = round(sum(latencies) / len(latencies), 2)
+            stats["latency_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+        receipts = stats["receipts_ok"] + stats["receipts_error"]
+        stats["delivery_success_ratio"] = round(stats["receipts_ok"] / receipts, 3) if receipts else None
+        try:
+            db = self._db()
+            stats["queued"] = db.execute("SELECT COUNT(*) FROM push_jobs").fetchone()[0]
+            stats["awaiting_receipt"] = db.execute("SELECT COUNT(*) FROM push_receipts").fetchone()[0]
+        except sqlite3.Error:
+            pass
+        return stats
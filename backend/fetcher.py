@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import feedparser
+import requests
+
+try:
+    from storage import atomic_write_json, load_json
+except ImportError:
+    from backend.storage import atomic_write_json, load_json
+
+# Concurrent feed fetching.
+# Every feed is downloaded in its own worker thread with a hard per-feed deadline,
+# so one slow host (YouTube, Valor) no longer holds up the whole cycle.
+# The pool grows to one thread per feed and each deadline counts from submission,
+# so a cycle never takes longer than FETCH_TIMEOUT, however many feeds there are.
+FETCH_TIMEOUT = 15 # seconds, total budget per feed (queueing + connect + download)
+MIN_WORKERS = 8
+CHUNK_SIZE = 16 * 1024
+USER_AGENT = "Mozilla/5.0 (compatible; NotifyInvest/1.0; +https://github.com/jeronimo-mg/notifyinvest)"
+
+# Conditional GET: ETag / Last-Modified validators are persisted per feed URL,
+# so an unchanged feed costs a 304 with an empty body and no parsing at all.
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feed_cache.json")
+
+_executor = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+_local = threading.local()
+_cache_lock = threading.Lock()
+_validators = load_json(CACHE_FILE, {})
+_validators_dirty = False
+_stats = {
+    "requests": 0,
+    "not_modified": 0,
+    "bytes_downloaded": 0,
+    "bytes_saved": 0,
+}
+
+
+class FeedTimeout(Exception):
+    pass
+
+
+def _get_session():
+    """One keep-alive session per worker thread (requests.Session is not thread-safe)."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({"User-Agent": USER_AGENT})
+        _local.session = session
+    return session
+
+
+def _conditional_headers(url):
+    with _cache_lock:
+        cached = _validators.get(url, {})
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+
+def _remember(url, response, size):
+    """Stores the validators of a full (200) response."""
+    global _validators_dirty
+    entry = {
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+        "size": size,
+    }
+    with _cache_lock:
+        _stats["bytes_downloaded"] += size
+        if not entry["etag"] and not entry["last_modified"]:
+            # Server does not support conditional requests, nothing to remember
+            if _validators.pop(url, None) is not None:
+                _validators_dirty = True
+            return
+        if _validators.get(url) != entry:
+            _validators[url] = entry
+            _validators_dirty = True
+
+
+def _get_executor(size):
+    """Shared pool with at least `size` threads (replaced by a larger one when the feed list grows)."""
+    global _executor, _executor_size
+    with _executor_lock:
+        if _executor is None or size > _executor_size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor_size = max(size, MIN_WORKERS)
+            _executor = ThreadPoolExecutor(max_workers=_executor_size, thread_name_prefix="feed-fetch")
+        return _executor
+
+
+def _download(url, deadline):
+    """
+    Downloads url, aborting once time.monotonic() passes deadline.
+    Returns None if the server answered 304 Not Modified.
+    """
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        raise FeedTimeout("Deadline passed before the download started")
+    response = _get_session().get(url, timeout=timeout, stream=True, headers=_conditional_headers(url))
+    try:
+        with _cache_lock:
+            _stats["requests"] += 1
+        if response.status_code == 304:
+            with _cache_lock:
+                _stats["not_modified"] += 1
+                _stats["bytes_saved"] += _validators.get(url, {}).get('size', 0)
+            return None
+        response.raise_for_status()
+        chunks = []
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise FeedTimeout("Download exceeded the feed deadline")
+        content = b"".join(chunks)
+        _remember(url, response, len(content))
+        return content
+    finally:
+        response.close()
+
+
+def fetch_feed(feed_item, timeout=FETCH_TIMEOUT, deadline=None):
+    """
+    Downloads and parses a single feed. Returns the feedparser result, or None if unchanged.
+    deadline (time.monotonic()) overrides timeout, e.g. to count from when the fetch was queued.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + timeout
+    content = _download(feed_item['url'], deadline)
+    if content is None:
+        return None
+    return feedparser.parse(content)
+
+
+def save_cache():
+    """Persists the feed validators if any changed since the last save."""
+    global _validators_dirty
+    with _cache_lock:
+        if not _validators_dirty:
+            return
+        snapshot = dict(_validators)
+        _validators_dirty = False
+    atomic_write_json(CACHE_FILE, snapshot)
+
+
+def get_cache_stats():
+    """Conditional GET counters (hit ratio = share of polls answered with 304)."""
+    with _cache_lock:
+        stats = dict(_stats)
+    stats["hit_ratio"] = round(stats["not_modified"] / stats["requests"], 3) if stats["requests"] else 0.0
+    return stats
+
+
+def fetch_feeds(feeds, timeout=FETCH_TIMEOUT):
+    """
+    Fetches all feeds in parallel.
+    Yields (feed_item, feed, error) as soon as each feed finishes, fastest first.
+    feed is None when the server answered 304 Not Modified.
+    The deadline is enforced inside each download, so the time the caller spends
+    processing one feed's entries does not count against the others.
+    """
+    feeds = list(feeds)
+    executor = _get_executor(len(feeds))
+    deadline = time.monotonic() + timeout
+    futures = {executor.submit(fetch_feed, item, deadline=deadline): item for item in feeds}
+    for future in as_completed(futures):
+        feed_item = futures[future]
+        try:
+            feed = future.result()
+        except Exception as e:
+            yield feed_item, None, e
+            continue
+        yield feed_item, feed, None
+    # Validators are only persisted once the caller has consumed every feed,
+    # so a crash mid-cycle cannot turn unprocessed entries into a 304 later.
+    save_cache()
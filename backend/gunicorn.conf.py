@@ -0,0 +1,34 @@
+import multiprocessing
+import os
+
+# Production serving for api.py:
+#   gunicorn -c backend/gunicorn.conf.py
+# Threaded workers (gthread): each request thread opens its own SQLite connection
+# (db.get_db() is thread-local) and the store runs in WAL mode, so any number of
+# readers share it safely with monitor.py. Every worker process keeps its own
+# signal cache and stream hub, both refreshed from the store's revision counters.
+# Long-lived /stream (SSE) clients and /signals long-polls hold one thread each. api.py
+# caps them at NOTIFYINVEST_MAX_STREAMS per worker (default: half of `threads`, i.e. 16),
+# so the other 16 threads always serve ordinary requests. With the defaults that is up to
+# 8 workers x 16 = 128 open streams; further clients get 503 + Retry-After (30s) on
+# /stream, or an immediate answer on long-polls, and fall back to polling. Raise
+# NOTIFYINVEST_THREADS (and the cap with it) for more concurrent streams.
+
+chdir = os.path.dirname(os.path.abspath(__file__)) # api.py imports its siblings
+wsgi_app = "api:app"
+
+bind = os.environ.get("NOTIFYINVEST_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = "gthread"
+threads = int(os.environ.get("NOTIFYINVEST_THREADS", 32))
+
+keepalive = 5 # seconds an idle keep-alive connection stays open
+timeout = 60 # restart a worker that stops responding for this long
+graceful_timeout = 30
+# Recycle workers now and then to cap memory growth; jitter avoids restarting all at once
+max_requests = 20000
+max_requests_jitter = 2000
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+try:
+    from storage import atomic_write_json, load_json
+except ImportError:
+    from backend.storage import atomic_write_json, load_json
+
+# Persistent result cache for the LLM stages (matcher and brain).
+# The same wire story is republished by several sources under different URLs;
+# keying on a normalized hash of title+summary means only the first copy pays
+# for inference. Entries expire after CACHE_TTL and the cache is an LRU capped
+# at CACHE_MAX_ENTRIES. It is saved to disk by flush(), once per monitor cycle.
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.json")
+CACHE_TTL = 3 * 24 * 3600 # 3 days, stories older than that are not re-published anyway
+CACHE_MAX_ENTRIES = 5000
+
+
+def content_key(namespace, title, summary=""):
+    """Hash of the normalized text: case, accents, punctuation, whitespace and markup do not matter."""
+    text = re.sub(r"<[^>]+>", " ", f"{title} {summary}")
+    text = unicodedata.normalize('NFKD', text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = " ".join(re.findall(r"[a-z0-9]+", text))
+    return namespace + ":" + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        now = time.time()
+        # key -> [timestamp, value], oldest first
+        self.entries = OrderedDict(
+            (key, entry) for key, entry in load_json(path, {}).items()
+            if now - entry[0] < ttl
+        )
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry[0] >= self.ttl:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = [time.time(), value]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def flush(self):
+        """Writes the cache to disk if anything was added since the last flush."""
+        with self.lock:
+            if not self.dirty:
+                return
+            cutoff = time.time() - self.ttl
+            snapshot = {key: entry for key, entry in self.entries.items() if entry[0] > cutoff}
+            self.dirty = False
+        atomic_write_json(self.path, snapshot)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# Shared by matcher.py and brain.py
+cache = LLMCache()
@@ -1,41 +1,62 @@
-import google.generativeai as genai
 import json
-import os
-
 
 try:
-    from secrets import GEMINI_API_KEY as API_KEY
+    from prefilter import has_candidates, resolve_tickers
+    from llm_cache import cache, content_key
+    from models import configure, get_model
 except ImportError:
-    from backend.secrets import GEMINI_API_KEY as API_KEY
-except:
-    API_KEY = os.getenv("GEMINI_API_KEY")
+    from backend.prefilter import has_candidates, resolve_tickers
+    from backend.llm_cache import cache, content_key
+    from backend.models import configure, get_model
+
+# User requested Gemma-3-12b.
+MATCHER_MODEL = 'gemma-3-12b-it'
 
-if not API_KEY:
-    print("WARNING: Gemini API Key not found. Please set GEMINI_API_KEY env var or create backend/secrets.py")
+
+# Counters for the status file: how many items never needed the LLM
+_stats = {"items": 0, "prefilter_rejects": 0, "fast_path_hits": 0, "llm_calls": 0}
 
 
 def configure_matcher_ai():
-    genai.configure(api_key=API_KEY)
+    configure()
+
+def get_matcher_stats():
+    stats = dict(_stats)
+    stats["prefilter_reject_ratio"] = round(stats["prefilter_rejects"] / stats["items"], 3) if stats["items"] else 0.0
+    # Share of items with a company mention that were resolved without a Gemma round trip
+    matched = stats["fast_path_hits"] + stats["llm_calls"]
+    stats["fast_path_ratio"] = round(stats["fast_path_hits"] / matched, 3) if matched else 0.0
+    return stats
 
 def find_matches(title, summary=""):
     """
-    Uses Gemma-3-12b-it to identify B3 companies in the text.
+    Identifies B3 companies in the text.
+    Explicit tickers and unambiguous names are resolved locally (see prefilter.py);
+    Gemma-3-12b-it is only asked about ambiguous mentions.
     Returns: List of tickers (e.g. ['PETR4', 'VALE3'])
     """
-    configure_matcher_ai()
-    
-    try:
-        # User requested Gemma-3-12b. 
-        model = genai.GenerativeModel('gemma-3-12b-it')
-    except Exception as e:
-        print(f"Error loading Gemma-3-12b-it: {e}")
-        raise e
-
-    
-    # Validation Helper
-    from b3_tickers import B3_TICKERS
-    
     text = f"{title}\n{summary}"
+    _stats["items"] += 1
+
+    # Cheap local check first: no known company name or ticker -> no LLM call
+    if not has_candidates(text):
+        _stats["prefilter_rejects"] += 1
+        return []
+
+    # Fast path: explicit tickers ("PETR4") and unambiguous names resolve locally.
+    # Only ambiguous mentions ("Vale", "Gol", "Inter") go to Gemma.
+    tickers, ambiguous = resolve_tickers(text)
+    if not ambiguous:
+        _stats["fast_path_hits"] += 1
+        return tickers
+
+    # Same story syndicated under another URL: reuse the earlier answer
+    cache_key = content_key("match", title, summary)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    model = get_model(MATCHER_MODEL)
     
     prompt = f"""
     Analyze the following news text and identify if any company listed on the Brazilian Stock Exchange (B3) is mentioned.
@@ -57,6 +78,7 @@ def find_matches(title, summary=""):
     """
     
     try:
+        _stats["llm_calls"] += 1
         response = model.generate_content(prompt)
         content = response.text.replace("```json", "").replace("```", "").strip()
         tickers = json.loads(content)
@@ -69,6 +91,7 @@ def find_matches(title, summary=""):
                 if len(t) >= 4 and any(char.isdigit() for char in t):
                     valid_tickers.append(t)
                 
+        cache.set(cache_key, valid_tickers)
         return valid_tickers
     except Exception as e:
         print(f"Matcher AI Error: {e}")
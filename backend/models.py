@@ -0,0 +1,60 @@
+import os
+import threading
+
+import google.generativeai as genai
+
+try:
+    from secrets import GEMINI_API_KEY as API_KEY
+except ImportError:
+    from backend.secrets import GEMINI_API_KEY as API_KEY
+except:
+    API_KEY = os.getenv("GEMINI_API_KEY")
+
+if not API_KEY:
+    print("WARNING: Gemini API Key not found. Please set GEMINI_API_KEY env var or create backend/secrets.py")
+
+# Shared model registry.
+# genai is configured once and each GenerativeModel is built on first use and then
+# reused by every caller and thread, so a matcher/brain call only pays for inference.
+_lock = threading.Lock()
+_configured = False
+_models = {}
+
+
+def configure():
+    global _configured
+    with _lock:
+        if not _configured:
+            genai.configure(api_key=API_KEY)
+            _configured = True
+
+
+def get_model(name):
+    """Returns the shared GenerativeModel for name, creating it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    configure()
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            try:
+                model = genai.GenerativeModel(name)
+            except Exception as e:
+                print(f"Error loading {name}: {e}")
+                raise e
+            _models[name] = model
+    return model
+
+
+def warm_up(names):
+    """
+    Builds the models and sends each one a 1-token request at startup,
+    so the connection is already open when the first headline arrives.
+    """
+    for name in names:
+        try:
+            get_model(name).generate_content("ping", generation_config={"max_output_tokens": 1})
+            print(f"Model ready: {name}")
+        except Exception as e:
+            print(f"Warm-up failed for {name}: {e}")
@@ -1,10 +1,7 @@
 import time
-import feedparser
-import json
 import sys
 import os
-import uuid
-import tempfile
+import threading
 
 # Add libs to path imports work
 # Add libs to path imports work
@@ -14,67 +11,78 @@ sys.path.append(os.path.dirname(__file__))
 
 try:
     from feeds import RSS_FEEDS
-    from matcher import find_matches
-    from brain import analyze_news, configure_genai
-    from push import send_push_notification
+    from fetcher import fetch_feeds, get_cache_stats
+    from storage import atomic_write_json
+    from seen_store import SeenStore
+    from clustering import StoryClusterer
+    from routing import SubscriberIndex
+    from preferences import PreferencesProvider
+    import db
+    from matcher import find_matches, get_matcher_stats, MATCHER_MODEL
+    from brain import analyze_news_batch, configure_genai, ANALYSIS_MODEL
+    from models import warm_up
+    from batching import MicroBatcher
+    from llm_cache import cache as llm_cache
+    from dispatch import PushDispatcher
     # Fallbacks not needed if sys.path is correct
 except ImportError as e:
     print(f"Startup Import Error: {e}")
     # Last ditch effort
     try:
         from backend.feeds import RSS_FEEDS
-        from backend.matcher import find_matches
-        from backend.brain import analyze_news, configure_genai
-        from backend.push import send_push_notification
+        from backend.fetcher import fetch_feeds, get_cache_stats
+        from backend.storage import atomic_write_json
+        from backend.seen_store import SeenStore
+        from backend.clustering import StoryClusterer
+        from backend.routing import SubscriberIndex
+        from backend.preferences import PreferencesProvider
+        from backend import db
+        from backend.matcher import find_matches, get_matcher_stats, MATCHER_MODEL
+        from backend.brain import analyze_news_batch, configure_genai, ANALYSIS_MODEL
+        from backend.models import warm_up
+        from backend.batching import MicroBatcher
+        from backend.llm_cache import cache as llm_cache
+        from backend.dispatch import PushDispatcher
     except:
         print("CRITICAL: importing modules failed.")
         raise
 except ImportError:
     # Fallback if running from root
     from backend.feeds import RSS_FEEDS
-    from backend.matcher import find_matches
-    from backend.brain import analyze_news, configure_genai
-    from backend.push import send_push_notification
+    from backend.fetcher import fetch_feeds, get_cache_stats
+    from backend.storage import atomic_write_json
+    from backend.seen_store import SeenStore
+    from backend.clustering import StoryClusterer
+    from backend.routing import SubscriberIndex
+    from backend.preferences import PreferencesProvider
+    from backend import db
+    from backend.matcher import find_matches, get_matcher_stats, MATCHER_MODEL
+    from backend.brain import analyze_news_batch, configure_genai, ANALYSIS_MODEL
+    from backend.models import warm_up
+    from backend.batching import MicroBatcher
+    from backend.llm_cache import cache as llm_cache
+    from backend.dispatch import PushDispatcher
 
 # Configuration
 # Configuration
 POLL_INTERVAL = 30 # 30 seconds for testing
 # Use absolute paths based on __file__ to avoid CWD issues
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SEEN_FILE = os.path.join(BASE_DIR, "seen_news.json")
+SEEN_FILE = os.path.join(BASE_DIR, "seen_news.jsonl")
+LEGACY_SEEN_FILE = os.path.join(BASE_DIR, "seen_news.json")
 STATUS_FILE = os.path.join(BASE_DIR, "status.json")
 EXPO_TOKEN = None # Will be set dynamically or loaded from config
 
-def atomic_write_json(filepath, data):
-    """Safely write JSON to a file using a temp file and atomic rename."""
-    dir_name = os.path.dirname(filepath)
-    prefix = os.path.basename(filepath)
-    
-    # Create temp file in same directory to ensure atomic move works
-    fd, temp_path = tempfile.mkstemp(prefix=f".{prefix}.tmp", dir=dir_name, text=True)
-    try:
-        with os.fdopen(fd, 'w') as f:
-            json.dump(data, f)
-        # Atomic replacement
-        os.replace(temp_path, filepath)
-    except Exception as e:
-        print(f"Failed to write {filepath}: {e}")
-        # Clean up temp file if something went wrong
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
+LEGACY_TOKEN_FILE = os.path.join(BASE_DIR, "token.txt")
 
-def load_seen():
-    if os.path.exists(SEEN_FILE):
-        with open(SEEN_FILE, 'r') as f:
-            return set(json.load(f))
-    return set()
+# Parsed user preferences, re-read only when the tokens table / token.txt change
+preferences_provider = PreferencesProvider(LEGACY_TOKEN_FILE)
 
+# Pushes are queued here and delivered by background workers (see dispatch.py)
+push_dispatcher = PushDispatcher(on_dead_tokens=preferences_provider.remove)
 
-def save_seen(seen_set):
-    atomic_write_json(SEEN_FILE, list(seen_set))
+def load_seen():
+    return SeenStore(SEEN_FILE, legacy_path=LEGACY_SEEN_FILE)
 
 def update_status(message):
     status = {
@@ -83,37 +91,66 @@ def update_status(message):
         "message": message,
         "rss_source_count": len(RSS_FEEDS),
         "rss_feeds": RSS_FEEDS,
+        "feed_cache": get_cache_stats(),
+        "matcher": get_matcher_stats(),
+        "llm_cache": llm_cache.stats(),
+        "push_queue": push_dispatcher.stats(),
         "pid": os.getpid()
     }
     atomic_write_json(STATUS_FILE, status)
 
-SIGNALS_FILE = os.path.join(os.path.dirname(__file__), "signals.json")
-MAX_SIGNALS = 1000 # Keep last 1000 signals (approx 3-6 months)
-
 def save_signal(title, body, data):
-    signals = []
-    if os.path.exists(SIGNALS_FILE):
-        try:
-            with open(SIGNALS_FILE, 'r') as f:
-                signals = json.load(f)
-        except:
-            signals = []
+    """Stores a signal in the shared database (see db.py). Returns its id."""
+    return db.insert_signal(title, body, data)
+
+def add_signal_source(signal_id, source):
+    """Records another outlet that carried the story behind an existing signal."""
+    db.add_signal_source(signal_id, source)
+
+
+def publish_signal(item, analysis, subscribers):
+    """Saves a BUY/SELL analysis as a signal and pushes it to the matching users."""
+    if analysis.get('signal') not in ['BUY', 'SELL']:
+        return
+
+    # New V3 Title Format: "PETR4: BUY"
+    push_title = f"{item['ticker']}: {analysis['signal']}"
     
-    # Add new item with UUID
-    new_signal = {
-        "id": str(uuid.uuid4()),
-        "title": title,
-        "body": body,
-        "data": data,
-        "timestamp": time.time()
-    }
+    # New V3 Body Format: "Impact: +2% - Reason..."
+    impact_str = analysis.get('impact', '0%')
+    msg = f"Estimativa: {impact_str}\n{analysis['reason']}"
     
-    signals.append(new_signal)
+    # Parse Impact
+    try:
+        # Removing %, +, whitespace
+        clean_impact = impact_str.replace('%', '').replace('+', '').strip()
+        impact_val = int(clean_impact)
+    except:
+        impact_val = 0
     
-    # Keep only last MAX_SIGNALS
-    signals = signals[-MAX_SIGNALS:]
+    print(f"Sending V3 Notification: {push_title} (Impact: {impact_val}%)")
     
-    atomic_write_json(SIGNALS_FILE, signals)
+    source_name = item['source_name']
+    story = item['story']
+    push_data = {
+        "url": item['link'],
+        "source_type": item['source_type'],
+        "source_name": source_name,
+        "sources": list(story["sources"])
+    }
+
+    # Save to signals DB (Always save, regardless of user prefs)
+    story["signal_id"] = save_signal(push_title, msg, push_data)
+
+    # Preferences are pre-compiled into an index: finding the recipients is a lookup,
+    # not a scan over every user (see routing.py)
+    recipients = subscribers.recipients(item['ticker'], source_name, analysis['signal'], impact_val)
+
+    # Delivery happens on the dispatch workers; the feed loop never waits on Expo
+    try:
+        push_dispatcher.enqueue(recipients, push_title, msg, data=push_data)
+    except Exception as push_err:
+        print(f"Failed to queue {push_title} for {len(recipients)} users: {push_err}")
 
 
 # Global for heartbeat
@@ -131,43 +168,47 @@ def heartbeat_loop():
 def main():
     print("Starting B3 News Monitor...")
     configure_genai()
+    # Build the shared Gemma clients now so the first headline only pays for inference
+    warm_up([MATCHER_MODEL, ANALYSIS_MODEL])
     
     seen_links = load_seen()
+    clusterer = StoryClusterer()
     
     # Start Heartbeat
-    import threading
     t = threading.Thread(target=heartbeat_loop, daemon=True)
     t.start()
-    
-    # Prepare for multi-user support
-    import json
-    token_file = os.path.join(os.path.dirname(__file__), 'tokens.json')
 
+    # Start push delivery workers (also resumes pushes queued before a restart)
+    push_dispatcher.start()
+    
     global CURRENT_MESSAGE
+    subscribers = SubscriberIndex()
 
-    while True:
-                # Load tokens dynamically (supports dict or list for migration)
-        if os.path.exists(token_file):
+    def analyze_batch(items):
+        """Analyzes a micro-batch of matched items with one Gemma request and publishes the signals."""
+        global CURRENT_MESSAGE
+        CURRENT_MESSAGE = f"Waiting for Gemini API ({', '.join(i['ticker'] for i in items)})..."
+        update_status(CURRENT_MESSAGE) # Force immediate update
+        try:
+            analyses = analyze_news_batch([(i['ticker'], i['title'], i['summary']) for i in items])
+        except Exception as e:
+            print(f"Analysis failed: {e}")
+            return
+        for item, analysis in zip(items, analyses):
+            print(f"Analysis [{item['ticker']}]: {analysis}")
             try:
-                with open(token_file, 'r') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        # Migrate on the fly for memory
-                        tokens = {t: {"min_buy": 0, "min_sell": 0} for t in data}
-                    else:
-                        tokens = data
-            except:
-                tokens = {}
-        else:
-            tokens = {}
-        
-        # Fallback (legacy file)
-        legacy_token_file = os.path.join(os.path.dirname(__file__), 'token.txt')
-        if os.path.exists(legacy_token_file):
-             with open(legacy_token_file, 'r') as f:
-                t = f.read().strip()
-                if t and t not in tokens: 
-                    tokens[t] = {"min_buy": 0, "min_sell": 0}
+                publish_signal(item, analysis, subscribers)
+            except Exception as e:
+                print(f"Publishing failed: {e}")
+
+    batcher = MicroBatcher(analyze_batch)
+    last_signal_prune = 0
+
+    while True:
+        # Preferences are only re-read (and re-indexed) when the tokens revision or token.txt changed
+        tokens, prefs_changed = preferences_provider.load()
+        if prefs_changed:
+            subscribers.sync(tokens)
 
         # Logic: If we found new items, we want to check again immediately (Burst Mode)
         # because staying up-to-date during a news flood is critical.
@@ -178,118 +219,84 @@ def main():
         CURRENT_MESSAGE = f"Checking {len(RSS_FEEDS)} feeds..."
         update_status(CURRENT_MESSAGE)
         
-        for feed_item in RSS_FEEDS:
+        # All feeds are downloaded in parallel; each one is processed as soon as it arrives
+        for feed_item, feed, fetch_error in fetch_feeds(RSS_FEEDS):
             feed_url = feed_item['url']
             source_type = feed_item['type']
             source_name = feed_item.get('name', 'Unknown')
+            if fetch_error:
+                print(f"Error fetching feed {feed_url}: {fetch_error}")
+                # Not re-read: keep its known items alive until it answers again
+                seen_links.touch_feed(feed_url)
+                continue
+            if feed is None:
+                # 304 Not Modified: nothing new since the last poll, skip parsing,
+                # but its items are still in the feed, so keep them from expiring
+                seen_links.touch_feed(feed_url)
+                continue
             try:
-                feed = feedparser.parse(feed_url)
                 for entry in feed.entries:
                     link = entry.link
-                    if link in seen_links:
+                    if seen_links.seen(link, feed_url):
                         continue
                     
                     # We found a new item!
                     found_any_new = True
-                    seen_links.add(link) 
+                    seen_links.add(link, feed_url)
                         
                     title = entry.title
                     summary = getattr(entry, 'summary', '')
+
+                    # Lightly reworded copy of a story we already handled from another outlet:
+                    # record the extra source and skip the LLM stages and pushes.
+                    story, is_duplicate = clusterer.assign(title, link, source_name)
+                    if is_duplicate:
+                        print(f"Duplicate story ({len(story['sources'])} sources): {title}")
+                        if story["signal_id"]:
+                            add_signal_source(story["signal_id"], story["sources"][-1])
+                        continue
                     
                     # Match (Gemma-12b)
                     try:
                         tickers = find_matches(title, summary)
+                        clusterer.mark_handled(story)
                     except Exception as e:
                         print(f"Matcher failed for {title}: {e}")
                         tickers = []
 
                     if tickers:
                         print(f"[{tickers[0]}] Match found: {title}")
-                        
-                        # Analyze (Gemma-27b)
-                        try:
-                            CURRENT_MESSAGE = f"Waiting for Gemini API ({tickers[0]})..."
-                            update_status(CURRENT_MESSAGE) # Force immediate update
-                            
-                            analysis = analyze_news(tickers[0], title, summary)
-                            print(f"Analysis: {analysis}")
-                            
-                            
-                            if analysis.get('signal') in ['BUY', 'SELL']:
-                                # New V3 Title Format: "PETR4: BUY"
-                                push_title = f"{tickers[0]}: {analysis['signal']}"
-                                
-                                # New V3 Body Format: "Impact: +2% - Reason..."
-                                impact_str = analysis.get('impact', '0%')
-                                msg = f"Estimativa: {impact_str}\n{analysis['reason']}"
-                                
-                                # Parse Impact
-                                try:
-                                    # Removing %, +, whitespace
-                                    clean_impact = impact_str.replace('%', '').replace('+', '').strip()
-                                    impact_val = int(clean_impact)
-                                except:
-                                    impact_val = 0
-                                
-                                print(f"Sending V3 Notification: {push_title} (Impact: {impact_val}%)")
-                                
-                                push_data = {
-                                    "url": link,
-                                    "source_type": source_type,
-                                    "source_name": source_name
-                                }
-
-                                # Save to signals DB (Always save, regardless of user prefs)
-                                save_signal(push_title, msg, push_data)
-
-                                for user_token, prefs in tokens.items():
-                                    should_send = False
-                                    min_buy = prefs.get('min_buy', 0)
-                                    min_sell = prefs.get('min_sell', 0)
-                                    whitelist = prefs.get('whitelist', [])
-                                    blacklist = prefs.get('blacklist', [])
-                                    source_whitelist = prefs.get('source_whitelist', [])
-                                    
-                                    # Filter by Company (Ticker)
-                                    # push_title is like "PETR4: BUY"
-                                    ticker = push_title.split(':')[0].strip().upper()
-                                    
-                                    # 1. Blacklist Check (Strongest exclude)
-                                    if ticker in blacklist:
-                                        print(f"Skipping {ticker} for {user_token} (Blacklisted)")
-                                        continue
-                                        
-                                    # 2. Whitelist Check (If active, must be in it)
-                                    if whitelist and len(whitelist) > 0:
-                                        if ticker not in whitelist:
-                                            print(f"Skipping {ticker} for {user_token} (Not in Whitelist)")
-                                            continue
-
-                                    # 3. Source Whitelist Check (If active, must be in it)
-                                    if source_whitelist and len(source_whitelist) > 0:
-                                        if source_name not in source_whitelist:
-                                            # print(f"Skipping {ticker} for {user_token} (Source {source_name} not in whitelist)")
-                                            continue
-
-                                    # 4. Impact Threshold Check
-                                    if analysis['signal'] == 'BUY':
-                                        if impact_val >= min_buy: should_send = True
-                                    elif analysis['signal'] == 'SELL':
-                                        if abs(impact_val) >= abs(min_sell): should_send = True
-                                    
-                                    if should_send:
-                                        try:
-                                            send_push_notification(user_token, push_title, msg, data=push_data)
-                                        except Exception as push_err:
-                                            print(f"Failed to send to {user_token}: {push_err}")
-                            
-                        except Exception as e:
-                            print(f"Analysis failed: {e}")
+                        # Analysis (Gemma-27b) runs in micro-batches, see analyze_batch()
+                        batcher.add({
+                            "ticker": tickers[0],
+                            "title": title,
+                            "summary": summary,
+                            "link": link,
+                            "source_type": source_type,
+                            "source_name": source_name,
+                            "story": story
+                        })
                                 
             except Exception as e:
                 print(f"Error processing feed {feed_url}: {e}")
         
-        save_seen(seen_links)
+        # Analyze whatever is still waiting for its batch window before deciding on Burst Mode
+        batcher.flush()
+
+        # Persist only the links added this cycle (no-op when nothing was new)
+        seen_links.flush()
+        seen_links.evict()
+        llm_cache.flush()
+
+        # Signal history retention (by age and count), once a day
+        if time.time() - last_signal_prune > db.PRUNE_INTERVAL:
+            try:
+                removed = db.prune_signals()
+                if removed:
+                    print(f"Pruned {removed} old signals")
+            except Exception as e:
+                print(f"Signal pruning failed: {e}")
+            last_signal_prune = time.time()
         
         if found_any_new:
             print("New items processed! Checking again immediately (Burst Mode)...")
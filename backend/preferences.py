@@ -0,0 +1,93 @@
+import os
+import threading
+
+try:
+    import db
+except ImportError:
+    from backend import db
+
+# User preferences provider for the monitor.
+# The tokens table (written by api.py) is only re-read when its revision counter
+# changes, and the legacy token.txt when its stat signature (mtime, size, inode)
+# changes, so a poll cycle costs one indexed lookup and one stat() call no matter
+# how many users are registered. The parsed, validated preferences stay in memory
+# between changes.
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_list(value, upper=False):
+    if not isinstance(value, list):
+        return []
+    items = [str(v).strip() for v in value if v]
+    return [v.upper() for v in items] if upper else items
+
+
+def validate(prefs):
+    """Returns a clean copy of one user's preferences with every field present and typed."""
+    if not isinstance(prefs, dict):
+        prefs = {}
+    return {
+        "min_buy": _as_int(prefs.get("min_buy", 0)),
+        "min_sell": _as_int(prefs.get("min_sell", 0)),
+        "whitelist": _as_list(prefs.get("whitelist"), upper=True),
+        "blacklist": _as_list(prefs.get("blacklist"), upper=True),
+        "source_whitelist": _as_list(prefs.get("source_whitelist")),
+    }
+
+
+class PreferencesProvider:
+    def __init__(self, legacy_token_file=None):
+        self.legacy_token_file = legacy_token_file
+        self.lock = threading.Lock()
+        self.signatures = None
+        self.tokens = {}
+
+    def _read(self):
+        tokens = {t: validate(prefs) for t, prefs in db.load_tokens().items()}
+
+        # Fallback (legacy file)
+        if self.legacy_token_file and os.path.exists(self.legacy_token_file):
+            with open(self.legacy_token_file, 'r') as f:
+                t = f.read().strip()
+            if t and t not in tokens:
+                tokens[t] = dict(db.DEFAULT_PREFS)
+        return tokens
+
+    def load(self):
+        """
+        Returns (tokens, changed). tokens is {token: prefs}; changed is True when the
+        preferences were re-read since the last call. Treat the returned dict as read-only.
+        """
+        with self.lock:
+            try:
+                signatures = (db.get_revision('tokens'), _signature(self.legacy_token_file) if self.legacy_token_file else None)
+                if signatures == self.signatures:
+                    return self.tokens, False
+                tokens = self._read()
+            except Exception as e:
+                # Keep the last good copy, retry next cycle
+                print(f"Could not read preferences: {e}")
+                return self.tokens, False
+            self.tokens = tokens
+            self.signatures = signatures
+            return self.tokens, True
+
+    def remove(self, dead_tokens):
+        """Unregisters devices Expo reported as DeviceNotRegistered so they stop receiving pushes."""
+        removed = db.remove_tokens(dead_tokens)
+        if removed:
+            print(f"Removed {removed} dead token(s)")
@@ -0,0 +1,178 @@
+import re
+import unicodedata
+
+try:
+    from b3_tickers import B3_TICKERS
+    from tickers import get_ticker_names
+except ImportError:
+    from backend.b3_tickers import B3_TICKERS
+    from backend.tickers import get_ticker_names
+
+# Local pre-filter for the matcher.
+# A single Aho-Corasick automaton over every company name, alias and ticker we know
+# scans a headline in one pass (accent- and case-insensitive, whole words only).
+# Items with no candidate never reach the LLM.
+
+# Words that name a company but appear in almost every market headline as a generic
+# term ("ações na B3", "a Bolsa fechou em alta"). They are not evidence of a company
+# mention on their own. The explicit ticker (B3SA3) still matches.
+GENERIC_TERMS = {"B3", "BOLSA"}
+
+# Company names that are also everyday Portuguese words or collide with other brands
+# ("vale a pena", "gol de placa", "via Pix", "rumo a", "ao vivo"). A match on one of these still needs the LLM
+# to decide whether the company is really meant; every other name resolves locally.
+AMBIGUOUS_NAMES = {
+    "VALE", "GOL", "TIM", "INTER", "VIA", "RAIA", "AZUL", "NATURA", "MINERVA",
+    "PRIO", "CCR", "CVC", "SLC", "BB", "3R", "SANTANDER", "EQUATORIAL",
+    "OI", "RUMO", "VIVO", "MOTIVA", "VIBRA",
+}
+
+TICKER_RE = re.compile(r"\b[A-Z]{4}\d{1,2}\b")
+VALID_TICKERS = set(B3_TICKERS.values())
+
+
+def normalize(text):
+    """Uppercases, strips accents and turns punctuation into spaces ("Itaú" -> "ITAU")."""
+    text = unicodedata.normalize('NFKD', text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^A-Z0-9]+", " ", text.upper())
+
+
+class AhoCorasick:
+    def __init__(self, patterns):
+        # Trie as parallel lists: goto[node] = {char: node}, out[node] = [pattern, ...]
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern in patterns:
+            self._insert(pattern)
+        self._build()
+
+    def _insert(self, pattern):
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(pattern)
+
+    def _build(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and char not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(char, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text):
+        """Yields (end_index, pattern) for every occurrence in text."""
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern in self.out[node]:
+                yield i, pattern
+
+
+def _build_name_index():
+    """
+    normalized name -> set of tickers, from B3_TICKERS plus the hand-written aliases.
+    Also returns normalized name -> primary ticker (None when it cannot be decided locally).
+    """
+    index = {}
+    primary = {}
+    for name, ticker in B3_TICKERS.items():
+        key = normalize(name).strip()
+        index.setdefault(key, set()).add(ticker)
+        # B3_TICKERS already maps names to the most liquid ticker (Petrobras -> PETR4)
+        primary[key] = ticker
+    for ticker, aliases in get_ticker_names().items():
+        for alias in aliases:
+            key = normalize(alias).strip()
+            index.setdefault(key, set()).add(ticker)
+    for key, tickers in index.items():
+        if key not in primary:
+            primary[key] = next(iter(tickers)) if len(tickers) == 1 else None
+    for key in GENERIC_TERMS:
+        index.pop(key, None)
+    for key in AMBIGUOUS_NAMES:
+        primary[key] = None
+    index.pop("", None)
+    return index, primary
+
+
+NAME_INDEX, PRIMARY_TICKER = _build_name_index()
+_automaton = AhoCorasick(NAME_INDEX.keys())
+
+
+def scan(text):
+    """
+    Returns the known names/tickers found in text as a list of matched names,
+    in order of appearance. Matches nested inside a longer one are dropped
+    ("BANCO INTER" wins over "INTER").
+    """
+    # Pad with spaces so whole-word checks work at the edges
+    norm = f" {normalize(text)} "
+    spans = []
+    for end, pattern in _automaton.iter(norm):
+        start = end - len(pattern) + 1
+        if norm[start - 1] == " " and norm[end + 1] == " ":
+            spans.append((start, end, pattern))
+    # Longest first so nested matches can be discarded
+    spans.sort(key=lambda s: (s[0], -s[1]))
+    found = []
+    last_end = -1
+    for start, end, pattern in spans:
+        if end <= last_end:
+            continue
+        found.append(pattern)
+        last_end = end
+    return found
+
+
+def find_candidates(text):
+    """
+    Returns {matched_name: {tickers}} for every known name or ticker in text.
+    Empty dict means no B3 company is mentioned.
+    """
+    return {name: NAME_INDEX[name] for name in scan(text)}
+
+
+def has_candidates(text):
+    return bool(scan(text))
+
+
+def resolve_tickers(text):
+    """
+    Deterministic ticker extraction.
+    Returns (tickers, ambiguous):
+    - Literal valid tickers in the text ("PETR4") always resolve.
+    - Unambiguous company names resolve to their primary ticker.
+    - ambiguous is True when a name could not be decided locally and no
+      literal ticker was present, i.e. the LLM still has to look at it.
+    """
+    tickers = []
+    for ticker in TICKER_RE.findall(text.upper()):
+        if ticker in VALID_TICKERS and ticker not in tickers:
+            tickers.append(ticker)
+    explicit = bool(tickers)
+
+    ambiguous = False
+    for name in scan(text):
+        ticker = PRIMARY_TICKER.get(name)
+        if ticker is None:
+            ambiguous = True
+        elif ticker not in tickers:
+            tickers.append(ticker)
+
+    # An explicit ticker already tells us what the story is about
+    return tickers, ambiguous and not explicit
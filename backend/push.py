@@ -4,8 +4,34 @@ from exponent_server_sdk import (
     PushServerError,
     PushTicketError,
 )
+import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, HTTPError
 
+# Expo accepts at most 100 messages per push request
+PUSH_CHUNK_SIZE = 100
+# ...and at most 1000 ticket ids per receipt lookup
+RECEIPT_CHUNK_SIZE = 1000
+RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
+# Seconds to connect and to wait for Expo's answer; keeps a send well inside the dispatch lease
+PUSH_TIMEOUT = 10
+
+# One pooled keep-alive session for every request to Expo
+_session = requests.Session()
+_session.headers.update({
+    'accept': 'application/json',
+    'accept-encoding': 'gzip, deflate',
+    'content-type': 'application/json',
+})
+_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_client = PushClient(session=_session, timeout=PUSH_TIMEOUT)
+
+
+def is_mock_token(token):
+    """Mock Tokens (for Web/Emulator testing without EAS)"""
+    return not token.startswith("ExponentPushToken") and "MOCK_TOKEN" in token
+
+
 def send_push_notification(token, title, message, data=None):
     """
     Sends a push notification to an Expo Push Token.
@@ -15,14 +41,14 @@ def send_push_notification(token, title, message, data=None):
         return
 
     # Handle Mock Tokens (for Web/Emulator testing without EAS)
-    if not token.startswith("ExponentPushToken") and "MOCK_TOKEN" in token:
+    if is_mock_token(token):
         print(f"--> [MOCK PUSH] Simulating notification to {token}")
         print(f"    Title: {title}")
         print(f"    Body: {message}")
         return
 
     try:
-        response = PushClient().publish(
+        response = _client.publish(
             PushMessage(to=token,
                         title=title,
                         body=message,
@@ -40,3 +66,69 @@ def send_push_notification(token, title, message, data=None):
     except PushTicketError as exc:
         print(f"Push Ticket Error: {exc.push_response}")
         raise
+
+
+def send_push_batch(tokens, title, message, data=None):
+    """
+    Sends the same notification to many Expo Push Tokens,
+    in chunks of PUSH_CHUNK_SIZE messages per request over the pooled session.
+    Returns {token: result} where result is a dict:
+      {"status": "ok", "id": ticket_id} or {"status": "error", "message": ..., "error": ...}
+    "error" carries Expo's error code (e.g. "DeviceNotRegistered") when there is one.
+    """
+    results = {}
+    messages = []
+    for token in dict.fromkeys(tokens): # dedupe, keep order
+        if not token:
+            continue
+        if is_mock_token(token):
+            print(f"--> [MOCK PUSH] Simulating notification to {token}")
+            results[token] = {"status": "ok", "id": None}
+            continue
+        messages.append(PushMessage(to=token, title=title, body=message, data=data))
+
+    for start in range(0, len(messages), PUSH_CHUNK_SIZE):
+        chunk = messages[start:start + PUSH_CHUNK_SIZE]
+        try:
+            tickets = _client.publish_multiple(chunk)
+        except PushServerError as exc:
+            print(f"Push Server Error: {exc.errors}")
+            for msg in chunk:
+                results[msg.to] = {"status": "error", "message": str(exc), "error": None}
+            continue
+        except (ConnectionError, HTTPError) as exc:
+            print(f"Connection Error: {exc}")
+            for msg in chunk:
+                results[msg.to] = {"status": "error", "message": str(exc), "error": None}
+            continue
+
+        # Expo answers with one ticket per message, in request order
+        for msg, ticket in zip(chunk, tickets):
+            if ticket.is_success():
+                results[msg.to] = {"status": "ok", "id": ticket.id}
+            else:
+                details = ticket.details or {}
+                results[msg.to] = {"status": "error", "message": ticket.message, "error": details.get('error')}
+
+    return results
+
+
+def check_receipts(ticket_ids):
+    """
+    Fetches the delivery receipts for the given ticket ids.
+    Returns {ticket_id: {"status": "ok"} or {"status": "error", "message": ..., "error": ...}}.
+    Receipts that are not ready yet are simply missing from the result.
+    """
+    receipts = {}
+    for start in range(0, len(ticket_ids), RECEIPT_CHUNK_SIZE):
+        chunk = ticket_ids[start:start + RECEIPT_CHUNK_SIZE]
+        response = _session.post(RECEIPTS_URL, json={"ids": chunk}, timeout=30)
+        response.raise_for_status()
+        for ticket_id, receipt in response.json().get('data', {}).items():
+            details = receipt.get('details') or {}
+            receipts[ticket_id] = {
+                "status": receipt.get('status'),
+                "message": receipt.get('message'),
+                "error": details.get('error'),
+            }
+    return receipts
@@ -0,0 +1,143 @@
+import bisect
+import threading
+
+# Subscriber routing index.
+# Instead of checking every user's preferences for every signal, the preferences are
+# compiled into inverted indexes (ticker -> users, source -> users) and thresholds
+# grouped by value in sorted order. Finding the recipients of a signal is then a few
+# dict lookups and set operations. The index is updated per user when preferences change.
+
+
+class _ThresholdIndex:
+    """Users grouped by threshold value; values kept sorted for prefix lookups."""
+
+    def __init__(self):
+        self.values = [] # sorted distinct thresholds
+        self.users = {} # threshold -> set of tokens
+
+    def add(self, value, token):
+        if value not in self.users:
+            bisect.insort(self.values, value)
+            self.users[value] = set()
+        self.users[value].add(token)
+
+    def remove(self, value, token):
+        users = self.users.get(value)
+        if users is None:
+            return
+        users.discard(token)
+        if not users:
+            del self.users[value]
+            self.values.remove(value)
+
+    def at_most(self, value):
+        """All users whose threshold is <= value."""
+        result = set()
+        for threshold in self.values[:bisect.bisect_right(self.values, value)]:
+            result |= self.users[threshold]
+        return result
+
+
+class SubscriberIndex:
+    def __init__(self):
+        # Lookups run on the analysis batch thread while the feed loop syncs preferences
+        self.lock = threading.RLock()
+        self.prefs = {} # token -> the preferences the index was built from
+        self.ticker_whitelist = {} # ticker -> users that only want these tickers
+        self.any_ticker = set() # users without a ticker whitelist
+        self.ticker_blacklist = {} # ticker -> users that never want it
+        self.source_whitelist = {} # source -> users that only want these sources
+        self.any_source = set() # users without a source whitelist
+        self.min_buy = _ThresholdIndex()
+        self.min_sell = _ThresholdIndex() # by abs(min_sell)
+
+    @staticmethod
+    def _entries(prefs):
+        def as_int(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+        return (
+            set(prefs.get('whitelist') or []),
+            set(prefs.get('blacklist') or []),
+            set(prefs.get('source_whitelist') or []),
+            as_int(prefs.get('min_buy', 0)),
+            abs(as_int(prefs.get('min_sell', 0))),
+        )
+
+    def _apply(self, token, prefs, adding):
+        whitelist, blacklist, sources, min_buy, min_sell = self._entries(prefs)
+
+        def touch(index, key):
+            if adding:
+                index.setdefault(key, set()).add(token)
+            else:
+                users = index.get(key)
+                if users is not None:
+                    users.discard(token)
+                    if not users:
+                        del index[key]
+
+        for ticker in whitelist:
+            touch(self.ticker_whitelist, ticker)
+        for ticker in blacklist:
+            touch(self.ticker_blacklist, ticker)
+        for source in sources:
+            touch(self.source_whitelist, source)
+        if adding:
+            if not whitelist:
+                self.any_ticker.add(token)
+            if not sources:
+                self.any_source.add(token)
+            self.min_buy.add(min_buy, token)
+            self.min_sell.add(min_sell, token)
+        else:
+            self.any_ticker.discard(token)
+            self.any_source.discard(token)
+            self.min_buy.remove(min_buy, token)
+            self.min_sell.remove(min_sell, token)
+
+    def update(self, token, prefs):
+        """Adds or re-indexes one user."""
+        with self.lock:
+            old = self.prefs.get(token)
+            if old == prefs:
+                return
+            if old is not None:
+                self._apply(token, old, adding=False)
+            # Keep a copy: callers may mutate their dict later
+            prefs = {k: (list(v) if isinstance(v, list) else v) for k, v in prefs.items()}
+            self._apply(token, prefs, adding=True)
+            self.prefs[token] = prefs
+
+    def remove(self, token):
+        with self.lock:
+            old = self.prefs.pop(token, None)
+            if old is not None:
+                self._apply(token, old, adding=False)
+
+    def sync(self, tokens):
+        """Brings the index in line with a full {token: prefs} map, touching only what changed."""
+        with self.lock:
+            for token in [t for t in self.prefs if t not in tokens]:
+                self.remove(token)
+            for token, prefs in tokens.items():
+                self.update(token, prefs)
+
+    def recipients(self, ticker, source_name, signal, impact):
+        """Tokens that should receive a BUY/SELL signal for ticker from source_name with the given impact (%)."""
+        with self.lock:
+            if signal == 'BUY':
+                users = self.min_buy.at_most(impact)
+            elif signal == 'SELL':
+                users = self.min_sell.at_most(abs(impact))
+            else:
+                return set()
+            users = (users & self.any_ticker) | (users & self.ticker_whitelist.get(ticker, set()))
+            users -= self.ticker_blacklist.get(ticker, set())
+            users = (users & self.any_source) | (users & self.source_whitelist.get(source_name, set()))
+            return users
+
+    def __len__(self):
+        return len(self.prefs)
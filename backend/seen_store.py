@@ -0,0 +1,132 @@
+import json
+import os
+import time
+
+try:
+    from storage import load_json
+except ImportError:
+    from backend.storage import load_json
+
+# Dedupe store for news links.
+# Links are kept with their last-seen time and forgotten after SEEN_TTL, so memory
+# and disk usage track the feeds' recent history instead of growing forever.
+# On disk it is an append-only JSON-lines log ([link, timestamp, feed url] per line)
+# that is compacted (rewritten with only live entries and fresh timestamps) once a day.
+# Links remember the feed they came from: a feed that answers 304 Not Modified is not
+# parsed, so touch_feed() refreshes its links instead, and an old item is never
+# evicted while its feed still carries it. Links whose feed is unknown (migrated or
+# logged before feeds were tracked) are only kept alive by a parsed feed that still
+# lists them, which also records their feed; otherwise they age out after SEEN_TTL.
+# Writes are coalesced: add() only marks the link as pending and flush() appends
+# all pending links in one write at the end of the cycle. Idle cycles touch no files.
+SEEN_TTL = 7 * 24 * 3600 # 7 days
+COMPACT_INTERVAL = 24 * 3600 # rewrite the log at most once a day
+
+
+class SeenStore:
+    def __init__(self, path, ttl=SEEN_TTL, legacy_path=None):
+        self.path = path
+        self.ttl = ttl
+        self.links = {} # link -> last seen timestamp
+        self.feed_of = {} # link -> feed url (None: not known yet, e.g. logged before feeds were tracked)
+        self.feeds = {} # feed url -> set of links
+        self.log_lines = 0
+        self.last_compaction = 0
+        self.pending = [] # links added since the last flush
+        self._load(legacy_path)
+
+    def _load(self, legacy_path):
+        now = time.time()
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                for line in f:
+                    self.log_lines += 1
+                    try:
+                        record = json.loads(line)
+                        link, ts = record[0], record[1]
+                    except (ValueError, IndexError, TypeError):
+                        continue # Torn last line after a crash
+                    if now - ts < self.ttl and ts > self.links.get(link, 0):
+                        self.links[link] = ts
+                        self._link_feed(link, record[2] if len(record) > 2 else None)
+        elif legacy_path:
+            # One-time migration from the old seen_news.json (plain list of links)
+            for link in load_json(legacy_path, []):
+                self.links[link] = now
+                self._link_feed(link, None)
+            print(f"Migrated {len(self.links)} links from {legacy_path}")
+        self.compact()
+
+    def _link_feed(self, link, feed):
+        if link in self.feed_of:
+            old = self.feed_of[link]
+            if old == feed:
+                return
+            self.feeds[old].discard(link)
+        self.feed_of[link] = feed
+        self.feeds.setdefault(feed, set()).add(link)
+
+    def seen(self, link, feed=None):
+        """Returns True if link was already seen, refreshing its last-seen time."""
+        if link in self.links:
+            # Items still present in a feed must never expire, otherwise they come back as "new".
+            # The refreshed time only reaches the disk on the next compaction.
+            self.links[link] = time.time()
+            if feed:
+                self._link_feed(link, feed)
+            return True
+        return False
+
+    def add(self, link, feed=None):
+        self.links[link] = time.time()
+        self._link_feed(link, feed)
+        self.pending.append(link)
+
+    def touch_feed(self, feed):
+        """
+        Refreshes every link of a feed that was not re-read this cycle (304 Not Modified or
+        a fetch error): its items are still in the feed and must not expire. Returns the count.
+        """
+        now = time.time()
+        links = self.feeds.get(feed, ())
+        for link in links:
+            self.links[link] = now
+        return len(links)
+
+    def flush(self):
+        """Appends the links added since the last flush. No I/O if nothing changed."""
+        if not self.pending:
+            return 0
+        lines = [json.dumps([link, self.links[link], self.feed_of.get(link)]) + "\n"
+                 for link in self.pending if link in self.links]
+        with open(self.path, 'a') as f:
+            f.writelines(lines)
+        self.log_lines += len(lines)
+        count = len(self.pending)
+        self.pending = []
+        return count
+
+    def evict(self):
+        """Drops expired links and compacts the log once COMPACT_INTERVAL has passed."""
+        cutoff = time.time() - self.ttl
+        expired = [link for link, ts in self.links.items() if ts < cutoff]
+        for link in expired:
+            del self.links[link]
+            self.feeds[self.feed_of.pop(link)].discard(link)
+        if time.time() - self.last_compaction > COMPACT_INTERVAL:
+            self.compact()
+        return len(expired)
+
+    def compact(self):
+        """Rewrites the log with only the live entries (temp file + atomic rename)."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            for link, ts in self.links.items():
+                f.write(json.dumps([link, ts, self.feed_of.get(link)]) + "\n")
+        os.replace(temp_path, self.path)
+        self.log_lines = len(self.links)
+        self.last_compaction = time.time()
+        self.pending = [] # already included in the rewrite
+
+    def __len__(self):
+        return len(self.links)
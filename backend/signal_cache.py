@@ -0,0 +1,71 @@
+import threading
+import time
+
+try:
+    import db
+except ImportError:
+    from backend import db
+
+# Process-level cache of the newest signals for the Flask API.
+# The app polls /signals many times per minute, but signals only change
+# when monitor.py records one. The newest CACHE_SIZE signals are kept in memory,
+# newest first, and reloaded only when the store's revision counter moves; the
+# counter itself is checked at most once per CHECK_INTERVAL. Requests just slice
+# the cached tuple.
+CACHE_SIZE = 1000 # the most /signals can return
+CHECK_INTERVAL = 1.0 # seconds between revision checks
+
+
+class SignalCache:
+    def __init__(self, size=CACHE_SIZE, check_interval=CHECK_INTERVAL):
+        self.size = size
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.checked = 0
+        # (revision, signals newest first, {signal id: index}), replaced as a whole on refresh
+        self.state = None
+
+    def _refresh(self):
+        revision = db.get_revision('signals')
+        if self.state is None or revision != self.state[0]:
+            signals = db.get_signals(self.size)
+            signals.reverse()
+            positions = {signal["id"]: i for i, signal in enumerate(signals)}
+            self.state = (revision, tuple(signals), positions)
+        self.checked = time.time()
+
+    def _current(self):
+        if time.time() - self.checked > self.check_interval:
+            # Only one request refreshes; the others keep serving the current snapshot
+            blocking = self.state is None
+            if self.lock.acquire(blocking=blocking):
+                try:
+                    if time.time() - self.checked > self.check_interval:
+                        self._refresh()
+                finally:
+                    self.lock.release()
+        return self.state
+
+    def snapshot(self):
+        """Returns (revision, signals newest first). The tuple is shared: do not modify its items."""
+        revision, signals, _ = self._current()
+        return revision, signals
+
+    def latest(self, limit):
+        """The newest `limit` signals in chronological order (oldest first), as the app expects."""
+        signals = self.snapshot()[1]
+        count = min(limit, len(signals))
+        return list(signals[count - 1::-1]) if count > 0 else []
+
+    def after(self, signal_id, limit):
+        """
+        Delta sync: the oldest `limit` signals newer than signal_id, oldest first, plus whether
+        more are waiting. None when signal_id is not among the cached signals.
+        """
+        _, signals, positions = self._current()
+        position = positions.get(signal_id)
+        if position is None:
+            return None
+        stop = position - 1 - limit
+        newer = list(signals[position - 1:stop if stop >= 0 else None:-1]) if position > 0 and limit > 0 else []
+        return newer, position > limit
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from collections import deque
+
+try:
+    import db
+except ImportError:
+    from backend import db
+
+# Fan-out of new signals to streaming clients (/stream, long-polling /signals).
+# One background thread watches the store's revision counter; when monitor.py records
+# a signal, the hub reads the new rows once, serializes each one once, and wakes every
+# waiting client through a single Condition. Clients only track a position in the
+# hub's short in-memory backlog.
+POLL_INTERVAL = 0.5 # seconds between revision checks
+BACKLOG = 200 # recent events kept for clients that fall slightly behind
+
+
+class SignalHub:
+    def __init__(self, poll_interval=POLL_INTERVAL, backlog=BACKLOG):
+        self.poll_interval = poll_interval
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=backlog) # (position, signal id, serialized signal)
+        self.position = 0
+        self.revision = None
+        self.last_seq = None
+        self.start_lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Starts the watcher thread (once per process)."""
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="signal-hub", daemon=True)
+                self.thread.start()
+
+    def _poll_once(self):
+        revision = db.get_revision('signals')
+        if revision == self.revision:
+            return
+        if self.last_seq is None:
+            # First look: everything already stored is history, not news
+            self.last_seq = db.get_last_seq()
+            self.revision = revision
+            return
+        self.revision = revision
+        # Revisions also move on appended sources and pruning; only new rows are events
+        signals = db.get_signals(self.events.maxlen, after=self.last_seq)
+        if not signals:
+            return
+        self.last_seq = db.get_signal_seq(signals[-1]["id"]) or self.last_seq
+        with self.condition:
+            for signal in signals:
+                self.position += 1
+                self.events.append((self.position, signal["id"], json.dumps(signal)))
+            self.condition.notify_all()
+
+    def _loop(self):
+        while True:
+            try:
+                self._poll_once()
+            except Exception as e:
+                print(f"Signal hub error: {e}")
+            time.sleep(self.poll_interval)
+
+    def current(self):
+        """The position a new client starts from: only events after it are delivered."""
+        with self.condition:
+            return self.position
+
+    def wait(self, position, timeout):
+        """
+        Blocks until there are events after position or timeout passes.
+        Returns (new position, [(signal id, serialized signal), ...]).
+        """
+        with self.condition:
+            if self.position <= position:
+                self.condition.wait(timeout)
+            events = [(signal_id, payload) for n, signal_id, payload in self.events if n > position]
+            return self.position, events
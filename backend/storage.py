@@ -0,0 +1,36 @@
+import json
+import os
+import tempfile
+
+
+def atomic_write_json(filepath, data):
+    """Safely write JSON to a file using a temp file and atomic rename."""
+    dir_name = os.path.dirname(filepath)
+    prefix = os.path.basename(filepath)
+    
+    # Create temp file in same directory to ensure atomic move works
+    fd, temp_path = tempfile.mkstemp(prefix=f".{prefix}.tmp", dir=dir_name, text=True)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        # Atomic replacement
+        os.replace(temp_path, filepath)
+    except Exception as e:
+        print(f"Failed to write {filepath}: {e}")
+        # Clean up temp file if something went wrong
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except:
+                pass
+
+
+def load_json(filepath, default):
+    """Reads a JSON file, returning default if it is missing or corrupt."""
+    if not os.path.exists(filepath):
+        return default
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except:
+        return default
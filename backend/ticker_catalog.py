@@ -0,0 +1,69 @@
+import bisect
+import gzip
+import hashlib
+import html
+import json
+
+try:
+    from prefilter import normalize
+except ImportError:
+    from backend.prefilter import normalize
+
+# Read-only views of the B3 ticker database for the API.
+# Everything a request can ask for is built once per ticker-DB version: the table rows
+# of the /tickers page, the full list as compact JSON (plain and gzipped) and a sorted
+# prefix index over tickers, full names and the words inside names. A lookup is a
+# binary search plus a short scan; nothing is sorted or rendered per request.
+SEARCH_LIMIT = 20 # default number of search results
+GZIP_LEVEL = 9 # compressed once, so use the best ratio
+
+
+class TickerCatalog:
+    def __init__(self, tickers):
+        # [(name or key, ticker)], in the order the page shows them
+        self.entries = sorted(tickers.items())
+        payload = json.dumps(self.entries, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self.version = hashlib.sha1(payload).hexdigest()[:12]
+        self.json = payload
+        self.json_gzip = gzip.compress(payload, GZIP_LEVEL)
+        self.rows_html = "".join(
+            f"<tr><td>{html.escape(name)}</td><td><strong>{html.escape(ticker)}</strong></td></tr>"
+            for name, ticker in self.entries
+        )
+        self._build_index()
+
+    def _build_index(self):
+        keys = set()
+        self.normalized = [] # (name, ticker) per entry, as the index sees them
+        for i, (name, ticker) in enumerate(self.entries):
+            normalized = normalize(name).strip()
+            self.normalized.append((normalized, normalize(ticker).strip()))
+            keys.add((self.normalized[i][1], i))
+            keys.add((normalized, i))
+            # "BANCO INTER" is also found by "INTER"
+            for word in normalized.split()[1:]:
+                keys.add((word, i))
+        index = sorted(k for k in keys if k[0])
+        self.keys = [k for k, _ in index]
+        self.positions = [i for _, i in index]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Entries whose ticker, name or a word of the name starts with query (accent/case insensitive)."""
+        prefix = normalize(query).strip()
+        if not prefix or limit <= 0:
+            return []
+        results, found = [], set()
+        for k in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[k].startswith(prefix):
+                break
+            i = self.positions[k]
+            if i not in found:
+                found.add(i)
+                results.append(i)
+        # Best matches first: exact tickers/names, then shorter keys
+        results.sort(key=lambda i: (self.normalized[i][1] != prefix, self.normalized[i][0] != prefix,
+                                    len(self.entries[i][0]), i))
+        return [{"name": self.entries[i][0], "ticker": self.entries[i][1]} for i in results[:limit]]
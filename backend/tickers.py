@@ -25,29 +25,97 @@ def get_ticker_names():
     Returns a dictionary mapping Ticker -> Common Name/Keywords.
     Used for fuzzy matching in news.
     """
-    # Simply using the ticker name as a keyword for now, 
-    # but ideally we would map "PETR4" -> ["Petrobras", "Petrolileo Brasileiro"]
-    # We will expand this map for better 'Matcher' quality.
+    # Every ticker in B3_TICKERS has the names headlines actually use for it: this map is
+    # (with b3_tickers.py) the prefilter's vocabulary, and a headline that names a company
+    # only by a name missing here never reaches the Matcher.
     mapping = {
-        "PETR3": ["Petrobras"], "PETR4": ["Petrobras"],
-        "VALE3": ["Vale"],
-        "ITUB4": ["Itaú", "Itau Unibanco"],
-        "BBDC4": ["Bradesco"],
         "ABEV3": ["Ambev"],
+        "ALPA4": ["Alpargatas"],
+        "ALSO3": ["Allos", "Aliansce Sonae"],
+        "ARZZ3": ["Arezzo"],
+        "ASAI3": ["Assaí"],
+        "AZUL4": ["Azul"],
+        "B3SA3": ["B3", "Bolsa"],
         "BBAS3": ["Banco do Brasil"],
-        "WEGE3": ["WEG"],
-        "MGLU3": ["Magalu", "Magazine Luiza"],
-        "VIIA3": ["Via", "Casas Bahia"],
-        "JBSS3": ["JBS"],
-        "SUZB3": ["Suzano"],
-        "GGBR4": ["Gerdau"],
+        "BBDC3": ["Bradesco"], "BBDC4": ["Bradesco"],
+        "BBSE3": ["BB Seguridade"],
+        "BEEF3": ["Minerva"],
+        "BPAC11": ["BTG Pactual", "BTG"],
+        "BPAN4": ["Banco Pan"],
+        "BRAP4": ["Bradespar"],
+        "BRFS3": ["BRF"],
+        "BRKM5": ["Braskem"],
+        "CASH3": ["Méliuz"],
+        "CCRO3": ["CCR", "Motiva"],
+        "CIEL3": ["Cielo"],
+        "CMIG4": ["Cemig"],
+        "CMIN3": ["CSN Mineração"],
+        "COGN3": ["Cogna"],
+        "CPFE3": ["CPFL", "CPFL Energia"],
+        "CPLE6": ["Copel"],
+        "CRFB3": ["Carrefour Brasil", "Atacadão"],
+        "CSAN3": ["Cosan"],
         "CSNA3": ["Siderúrgica Nacional", "CSN"],
-        "ITSA4": ["Itaúsa"],
-        "HAPV3": ["Hapvida"],
+        "CVCB3": ["CVC"],
+        "CYRE3": ["Cyrela"],
+        "DXCO3": ["Dexco"],
+        "ECOR3": ["Ecorodovias"],
+        "EGIE3": ["Engie Brasil", "Engie"],
+        "ELET3": ["Eletrobras"], "ELET6": ["Eletrobras"],
+        "EMBR3": ["Embraer"],
+        "ENBR3": ["EDP Brasil", "Energias do Brasil"],
+        "ENEV3": ["Eneva"],
+        "ENGI11": ["Energisa"],
         "EQTL3": ["Equatorial"],
-        "RENT3": ["Localiza"],
-        "RDOR3": ["Rede D'Or"],
+        "EZTC3": ["EZTec"],
+        "FLRY3": ["Fleury"],
+        "GGBR4": ["Gerdau"],
+        "GOAU4": ["Metalúrgica Gerdau"],
+        "GOLL4": ["Gol"],
+        "HAPV3": ["Hapvida"],
+        "HYPE3": ["Hypera"],
+        "IGTI11": ["Iguatemi"],
+        "IRBR3": ["IRB Brasil", "IRB"],
+        "ITSA4": ["Itaúsa"],
+        "ITUB4": ["Itaú", "Itau Unibanco"],
+        "JBSS3": ["JBS"],
+        "KLBN11": ["Klabin"],
         "LREN3": ["Lojas Renner", "Renner"],
-        "B3SA3": ["B3", "Bolsa"],
+        "LWSA3": ["Locaweb"],
+        "MGLU3": ["Magalu", "Magazine Luiza"],
+        "MRFG3": ["Marfrig"],
+        "MRVE3": ["MRV"],
+        "MULT3": ["Multiplan"],
+        "NTCO3": ["Natura"],
+        "OIBR3": ["Oi"],
+        "PCAR3": ["GPA", "Pão de Açúcar"],
+        "PETR3": ["Petrobras"], "PETR4": ["Petrobras"],
+        "PETZ3": ["Petz"],
+        "POSI3": ["Positivo Tecnologia"],
+        "PRIO3": ["PRIO", "PetroRio"],
+        "QUAL3": ["Qualicorp"],
+        "RADL3": ["Raia Drogasil", "RD Saúde", "Raia"],
+        "RAIL3": ["Rumo"],
+        "RAIZ4": ["Raízen"],
+        "RDOR3": ["Rede D'Or"],
+        "RENT3": ["Localiza"],
+        "RRRP3": ["3R Petroleum", "3R"],
+        "SANB11": ["Santander Brasil", "Santander"],
+        "SBSP3": ["Sabesp"],
+        "SLCE3": ["SLC Agrícola", "SLC"],
+        "SMTO3": ["São Martinho"],
+        "SOMA3": ["Grupo Soma"],
+        "SUZB3": ["Suzano"],
+        "TAEE11": ["Taesa"],
+        "TIMS3": ["TIM"],
+        "TOTS3": ["Totvs"],
+        "UGPA3": ["Ultrapar"],
+        "USIM5": ["Usiminas"],
+        "VALE3": ["Vale"],
+        "VBBR3": ["Vibra", "Vibra Energia"],
+        "VIIA3": ["Via", "Casas Bahia"],
+        "VIVT3": ["Vivo", "Telefônica Brasil"],
+        "WEGE3": ["WEG"],
+        "YDUQ3": ["Yduqs"],
     }
     return mapping
@@ -1,7 +1,4 @@
-import json
-import time
 import os
-import uuid
 import sys
 
 # Ensure we can import backend paths
@@ -15,39 +12,19 @@ except ImportError:
     sys.path.append('backend')
     from backend.push import send_push_notification
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # Should be /home/opc/notifyinvest/backend
-TOKENS_FILE = os.path.join(BASE_DIR, 'tokens.json')
-SIGNALS_FILE = os.path.join(BASE_DIR, 'signals.json')
+try:
+    import db
+except ImportError:
+    from backend import db
 
 def load_tokens():
-    if os.path.exists(TOKENS_FILE):
-        with open(TOKENS_FILE, 'r') as f:
-            return json.load(f)
-    print("No tokens found.")
-    return []
+    tokens = db.load_tokens()
+    if not tokens:
+        print("No tokens found.")
+    return tokens
 
 def save_signal(title, body, data):
-    signals = []
-    if os.path.exists(SIGNALS_FILE):
-        try:
-            with open(SIGNALS_FILE, 'r') as f:
-                signals = json.load(f)
-        except:
-            signals = []
-    
-    new_signal = {
-        "id": str(uuid.uuid4()),
-        "title": title,
-        "body": body,
-        "data": data,
-        "timestamp": time.time()
-    }
-    
-    signals.append(new_signal)
-    signals = signals[-1000:] # Keep last 1000
-    
-    with open(SIGNALS_FILE, 'w') as f:
-        json.dump(signals, f)
+    db.insert_signal(title, body, data)
     print("Signal saved to DB.")
 
 def main():
@@ -1,8 +1,9 @@
-import json
 import requests
-import time
 
-TOKEN_FILE = '/opt/notifyinvest/backend/tokens.json'
+try:
+    import db
+except ImportError:
+    from backend import db
 
 def send_push_notification(token, title, body, data=None):
     url = "https://exp.host/--/api/v2/push/send"
@@ -27,10 +28,9 @@ def send_push_notification(token, title, body, data=None):
         print(f"Error sending to {token}: {e}")
 
 try:
-    with open(TOKEN_FILE, 'r') as f:
-        tokens = json.load(f)
+    tokens = db.load_tokens()
     
-    print(f"Found {len(tokens)} tokens in {TOKEN_FILE}")
+    print(f"Found {len(tokens)} tokens in {db.DB_FILE}")
 
     if not tokens:
         print("No tokens found! App registration failed.")